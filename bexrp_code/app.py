@@ -1,14 +1,33 @@
 #!/usr/bin/env python3 
-import random, re
+import time
 
-from numpy import printoptions
+# startup profile: seconds spent in each import group / startup stage, served by /api/ready
+_startup_mark = time.perf_counter()
+startup_profile = {}
+
+def profile_stage(name):
+    global _startup_mark
+    now = time.perf_counter()
+    startup_profile[name] = round(now - _startup_mark, 3)
+    _startup_mark = now
+
+import os, sys, gc, random, re, json, hashlib, argparse, threading
+from functools import partial, lru_cache
+from contextlib import closing
+from collections import Counter
+profile_stage('import stdlib')
 
 # pmc toolkit made by VexilonHacker
-from pmc_toolkit import PMCDatabase
-from flask import Flask, render_template, jsonify, request
+from pmc_toolkit import PMCDatabase, LazyModel, KeywordExtractor, SENTENCE_MODEL, SENTENCE_MODEL_NAME, encode_texts
+profile_stage('import pmc_toolkit')
+import numpy as np
+from corpus_index import EmbeddingIndex, FacetIndex, KnowledgeGraph, Publication, PublicationLookup, PublicationStore, author_node_id, keyword_node_id, normalize_str
+profile_stage('import corpus_index')
+from summary_toolkit import SummaryCache, SummaryBatcher, SUMMARY_MODEL, SUMMARY_MIN_LEN, SUMMARY_MAX_LEN, SummaryPlanner, pick_summary_text, summarize_plan, stream_summary, load_summarization_pipeline, summary_model_key
+profile_stage('import summary_toolkit')
+from flask import Flask, Response, render_template, jsonify, request, stream_with_context
 from flask_compress import Compress
-from transformers import pipeline
-from collections import Counter
+profile_stage('import flask')
 
 TEMPLATE_DIR = './templates/'
 STATIC_DIR = './static/'
@@ -18,15 +37,58 @@ DBFILE = 'pmc_articles_csv_metadata.db'
 PER_PAGE = 20  # articles per page
 # TITLE = 'BEXRP'
 TITLE = 'Biology Experiment Research Portal'
-MODEL  = "sshleifer/distilbart-cnn-12-6"
-SUMMARIZATION_MIN_LEN  = 50 
-SUMMARIZATION_MAX_LEN  = 120
-ENABLE_LIVERELOAD = True
+MODEL  = SUMMARY_MODEL  # shared with the offline pre-summarization job so cached summaries match
+SUMMARIZATION_MIN_LEN  = SUMMARY_MIN_LEN
+SUMMARIZATION_MAX_LEN  = SUMMARY_MAX_LEN
+SUMMARY_LONG_INPUTS = 'chunk'  # inputs over the model's token limit: 'truncate' or 'chunk' (map-reduce)
+SUMMARY_BACKEND = 'torch'  # 'torch', 'int8' (dynamic quantization) or 'onnx' (ONNX Runtime), see benchmarks/summary_backends.py
+NO_ABSTRACT = 'Error in summary'  # placeholder shown for articles without an abstract
+SUMMARY_CACHE_SIZE = 1024  # summaries kept in memory in front of the summaries table
+SUMMARY_BATCH_SIZE = 8  # concurrent /api/summary requests coalesced into one forward pass
+SUMMARY_BATCH_WAIT = 0.02  # seconds the batcher waits for more requests after the first
+SUMMARY_BATCH_TIMEOUT = 300.0  # seconds a request waits for its batched summary before giving up
+SUMMARY_STREAM_CONCURRENCY = SUMMARY_BATCH_SIZE  # streamed generations running at once per process, more get a 503 'failure'
+ENABLE_LIVERELOAD = True  # note: the livereload server buffers whole responses, so /api/summary/stream arrives in one piece
 DEBUG = True
-MAX_INITIAL_NODES = 10
+MAX_INITIAL_NODES = 10  # nodes in the initial "most central" knowledge graph view
+KG_MAX_HOPS = 3  # deepest /api/kg expansion
+KG_MAX_FANOUT = 50  # neighbors followed per node / related nodes returned per /api/kg query
+KG_MAX_NODES = 500  # nodes returned by one /api/kg expansion
+KG_CENTRAL_NEIGHBORS = 3  # most central neighbors shown with each node of a "central" view, so it is connected
+FACET_COUNTS_LIMIT = 50  # top values per facet returned with /api/advancedf results
+FACET_COUNTS_MAX = 500  # upper bound for a client supplied facet_limit
+SEARCH_MODES = ('keyword', 'semantic', 'hybrid')  # /api/advancedf "mode": FTS5, embeddings, or both fused
+SEMANTIC_TOP_K = 100  # most similar articles returned by a semantic query
+HYBRID_RRF_K = 60  # reciprocal rank fusion constant; larger flattens the weight of top ranks
 TOTAL_ARTICLES = 608 
+CARD_FIELDS = ('id', 'Title', 'Link', 'Authors', 'Publisher', 'Pmcid', 'Keywords', 'PublicationDate', 'Image', 'Pdf',
+               'Default_Img_Found')  # what a result card needs; Abstract/Sections/Images come from /api/article
+CHART_TOP_CATEGORIES = 20  # keywords on the analytics page category chart
+CHART_TOP_AUTHORS = 15
+CHART_TOP_PUBLISHERS = 15
+CHART_ARTICLES_PER_PAGE = 50  # page size (and cap) of /api/charts/articles
+WARM_UP_MODELS = True  # load the summarizer in a background thread at startup instead of on first use
+STARTUP_TARGET_SECONDS = 5.0  # cold start budget (imports + corpus), warned about when exceeded
+# production mode (python app.py --production): preforking gunicorn, corpus loaded once before fork
+SERVE_WORKERS = os.cpu_count() or 1  # worker processes
+SERVE_THREADS = 8  # request threads per worker
+SERVE_TIMEOUT = 120  # seconds before a stuck worker is restarted; a cold summary can take a while
+SERVE_SUMMARIZER = 'shared'  # 'shared': models loaded in the master and shared copy-on-write, 'lazy': each worker loads its own on first use
 app = Flask(__name__, template_folder=TEMPLATE_DIR, static_folder=STATIC_DIR)
-summarizer = pipeline('summarization', model=MODEL)
+summarizer = LazyModel("summarizer", partial(load_summarization_pipeline, MODEL, backend=SUMMARY_BACKEND))
+summary_planner = LazyModel("summary planner", partial(SummaryPlanner.from_pretrained, MODEL, min_len=SUMMARIZATION_MIN_LEN,
+                                                         max_len=SUMMARIZATION_MAX_LEN, long_inputs=SUMMARY_LONG_INPUTS))
+SUMMARY_CACHE_MODEL = summary_model_key(MODEL, SUMMARY_BACKEND)
+SUMMARY_STREAM_CACHE_MODEL = summary_model_key(MODEL, SUMMARY_BACKEND, decoding='greedy')  # streamed summaries decode greedily
+summary_stream_slots = threading.BoundedSemaphore(SUMMARY_STREAM_CONCURRENCY)
+summary_batcher = SummaryBatcher(summarizer, max_batch_size=SUMMARY_BATCH_SIZE, max_wait=SUMMARY_BATCH_WAIT,
+                                 timeout=SUMMARY_BATCH_TIMEOUT)
+
+publications = []
+charts_payload = {"years": [], "categories": [], "authors": [], "publishers": [], "articles_total": 0, "version": "empty"}
+charts_drilldown = {"year": {}, "category": {}, "author": {}, "publisher": {}}
+embeddings = None  # EmbeddingIndex, None until built (semantic/hybrid fall back to keyword)
+embedding_pub_ids = None  # publication id of each embedding row, -1 for rows no longer in the corpus
 
 app.config['TEMPLATES_AUTO_RELOAD'] = True
 app.config['COMPRESS_ALGORITHM'] = 'brotli'  
@@ -36,8 +98,86 @@ Compress(app)
 
 
 
-def normalize_str(s):
-    return s.lower().strip() if isinstance(s, str) else s
+def search_publications(q):
+    """publications matching q through the FTS5 index, best BM25 match first"""
+    return [pub_lookup.by_pmcid[pmcid] for pmcid, _ in db.search(q) if pmcid in pub_lookup.by_pmcid]
+
+
+def requested_fields(value, default):
+    """
+    fields= selector (list or comma separated string) -> publication keys to return;
+    'all' returns every field, unknown names are ignored and 'id' is always kept
+    """
+    if not value:
+        return default
+    if isinstance(value, str):
+        value = value.split(',')
+    names = [str(f).strip() for f in value]
+    if 'all' in names:
+        return None
+    known = Publication.FIELDS
+    return ['id'] + [f for f in dict.fromkeys(names) if f in known and f != 'id']
+
+
+def project(pub, fields):
+    return pub.to_dict(fields)
+
+
+def bounded(value, default, upper):
+    """client supplied count clamped to 1..upper, default when missing or not a number"""
+    try:
+        return max(1, min(int(value), upper))
+    except (TypeError, ValueError):
+        return default
+
+
+@lru_cache(maxsize=1024)
+def embed_query(q):
+    return encode_texts([q])[0]
+
+
+def semantic_ids(q, mask):
+    """ids of the SEMANTIC_TOP_K publications passing mask that are closest to q, most similar first"""
+    valid = embedding_pub_ids >= 0
+    row_mask = np.zeros(len(embedding_pub_ids), dtype=bool)
+    row_mask[valid] = mask[embedding_pub_ids[valid]]
+    rows, _ = embeddings.top_k(embed_query(q), SEMANTIC_TOP_K, row_mask=row_mask)
+    return embedding_pub_ids[rows].tolist()
+
+
+def reciprocal_rank_fusion(*rankings):
+    scores = Counter()
+    for ranking in rankings:
+        for rank, pub_id in enumerate(ranking):
+            scores[pub_id] += 1.0 / (HYBRID_RRF_K + rank + 1)
+    return [pub_id for pub_id, _ in scores.most_common()]
+
+
+def ranked_search(q, mode, mask):
+    """publication ids for q, best first, and the mode actually used (keyword when embeddings are unavailable)"""
+    if mode in ('semantic', 'hybrid') and embeddings is not None:
+        try:
+            semantic = semantic_ids(q, mask)
+        except Exception as e:
+            print(f"[ERROR] Semantic search failed, using keyword search: {e}")
+        else:
+            if mode == 'semantic':
+                return semantic, mode
+            return reciprocal_rank_fusion([pub['id'] for pub in search_publications(q)], semantic), mode
+    return [pub['id'] for pub in search_publications(q)], 'keyword'
+
+
+@app.route('/api/ready', methods=['GET'])
+def readiness():
+    models = {model.name: model.status() for model in (summarizer, summary_planner, KeywordExtractor.MODEL, SENTENCE_MODEL)}
+    ready = bool(publications) and summarizer.state == 'ready' and summary_planner.state == 'ready'
+    return jsonify({
+        'ready': ready,
+        'articles': len(publications),
+        'models': models,
+        'startup': startup_profile,
+    }), 200 if ready else 503
+
 
 @app.route('/api/advancedf', methods=['POST'])
 def advanced_search():
@@ -45,78 +185,33 @@ def advanced_search():
     q = (data.get('q') or "").strip().lower()
     filters = data.get('filters', {})
     sort = data.get('sort', 'best')
-    print(data)
-
-    results = publications.copy()
-
+    mode = data.get('mode') or 'keyword'
+    if mode not in SEARCH_MODES:
+        return jsonify({'error': f"Unknown search mode '{mode}', expected one of: {', '.join(SEARCH_MODES)}"}), 400
+
+    # with a query, candidates come back in relevance order, which is what "best" keeps;
+    # without one "best" is the completeness ordering of publications
+    mask = facet_index.filter_mask(filters)
+    ranked_ids = None
     if q:
-        results = [pub for pub in results if q in (pub.get('Title') or '').lower()]
-
-    for group_name, selected in filters.items():
-        if not selected:
-            continue
-        selected_norm = [normalize_str(s) for s in selected]
-
-        if group_name == "Keywords":
-            include_no_keyword = any("no keyword" in s for s in selected_norm)
-
-            results = [
-                pub for pub in results
-                if (any(normalize_str(k) in selected_norm for k in pub.get('Keywords') or []))
-                   or (include_no_keyword and not pub.get('Keywords'))
-            ]
-
-        elif group_name == "Authors":
-            include_no_author = "no author" in selected_norm
-            results = [
-                pub for pub in results
-                if (any(normalize_str(a) in selected_norm for a in pub.get('Authors') or []))
-                   or (include_no_author and not pub.get('Authors'))
-            ]
-
-        elif group_name == "Publication Year":
-            selected_years = []
-            for s in selected:
-                try:
-                    selected_years.append(int(s))
-                except ValueError:
-                    continue
-            include_no_year = "no year" in selected_norm
-            results = [
-                pub for pub in results
-                if (pub.get('PublicationDate') and pub['PublicationDate'][:4].isdigit() 
-                    and int(pub['PublicationDate'][:4]) in selected_years)
-                   or (include_no_year and not pub.get('PublicationDate'))
-            ]
-        elif group_name == "Publisher":
-            include_no_publisher = "no publisher" in selected_norm
-            results = [
-                pub for pub in results
-                if (
-                    any(s in normalize_str(pub.get('Publisher') or '') for s in selected_norm)
-                    or (include_no_publisher and not pub.get('Publisher'))
-                )
-            ]
-
-
-    # Sorting
-    if sort == "newest":
-        results.sort(key=lambda pub: pub.get("PublicationDate") or "", reverse=True)
-    elif sort == "oldest":
-        results.sort(key=lambda pub: pub.get("PublicationDate") or "")
+        ranked_ids, mode = ranked_search(q, mode, mask)
+    result_ids = facet_index.select(mask, sort=sort, ranked_ids=ranked_ids)
 
     # Pagination
     page = int(data.get('page', 1))
-    total = len(results)
+    total = len(result_ids)
     start = (page - 1) * PER_PAGE
     end = start + PER_PAGE
-    page_items = results[start:end]
+    fields = requested_fields(data.get('fields'), CARD_FIELDS)
+    page_items = [project(publications[i], fields) for i in result_ids[start:end]]
 
     return jsonify({
         'articles': page_items,
         'page': page,
         'total': total,
-        'per_page': PER_PAGE
+        'per_page': PER_PAGE,
+        'mode': mode if q else 'keyword',
+        'facets': facet_index.counts(result_ids, limit=bounded(data.get('facet_limit'), FACET_COUNTS_LIMIT, FACET_COUNTS_MAX))
     })
 
 
@@ -128,15 +223,14 @@ def get_articles():
     q = (data.get('q') or "").strip().lower()
     page = int(data.get('page') or 1)
     sort_order = data.get('sort')  
-    print(data)
 
     if not publications:
         return jsonify({'articles': [], 'page': page, 'total': 0, 'per_page': PER_PAGE})
 
     if q:
-        filtered = [pub for pub in publications if q in (pub.get('Title') or '').lower()]
+        filtered = search_publications(q)
     else:
-        filtered = publications.copy()
+        filtered = list(publications)
 
     if sort_order in ('newest', 'oldest'):
         def parse_date(pub):
@@ -146,7 +240,8 @@ def get_articles():
     total = len(filtered)
     start = (page - 1) * PER_PAGE
     end = start + PER_PAGE
-    page_items = filtered[start:end]
+    fields = requested_fields(data.get('fields'), CARD_FIELDS)
+    page_items = [project(pub, fields) for pub in filtered[start:end]]
 
     return jsonify({
         'articles': page_items,
@@ -156,174 +251,264 @@ def get_articles():
     })
 
 
-@app.route('/api/summary', methods=['POST'])
-def get_summary():
-    data = request.get_json() or {}
-    title = (data.get('title') or "").strip()
-    pub_id = data.get('pub_id')
+@app.route('/api/article/<ref>', methods=['GET'])
+def article_detail(ref):
+    """one full publication by id or PMCID, e.g. /api/article/12 or /api/article/PMC123?fields=Abstract,Images"""
+    pub = pub_lookup.by_id.get(int(ref)) if ref.isdigit() else pub_lookup.by_pmcid.get(ref.upper())
+    if pub is None:
+        return jsonify({'error': 'Article not found'}), 404
+    return jsonify(project(pub, requested_fields(request.args.get('fields'), None)))
+
+
+def summarize(pmcid, text):
+    plan = summary_planner.get().plan(text)
+    summary = summary_cache.get(pmcid, text, SUMMARY_CACHE_MODEL, plan.min_length, plan.max_length)
+    if summary is None:
+        summary = summarize_plan(plan, summary_batcher.summarize_many)
+        summary_cache.put(pmcid, text, SUMMARY_CACHE_MODEL, plan.min_length, plan.max_length, summary)
+    return summary
+
+def pub_summary_text(pub):
+    # same text choice as the DB records and the offline job, so precomputed summaries are hits
+    abstract = pub.get('Abstract')
+    return pick_summary_text({
+        'abstract': '' if abstract == NO_ABSTRACT else abstract,
+        'sections': pub.get('Sections'),
+    })
 
-    def pick_text_from_record(rec):
-        if not rec:
-            return None
-        abstract = rec.get('abstract') or rec.get('Abstract') or ""
-        if abstract and isinstance(abstract, str) and abstract.strip():
-            return abstract.strip()
-        sections = rec.get('sections') or rec.get('Sections')
-        if sections and isinstance(sections, dict):
-            paragraphs = [t for t in sections.values() if isinstance(t, str) and t.strip()]
-            if paragraphs:
-                paragraphs.sort(key=len)
-                return paragraphs[0].strip()
-        return None
 
+def summary_source(title, pub_id):
+    """(pmcid, text, None, None) for the requested article, or (None, None, message, status)."""
     if title:
-        try:
-            title_matches = db.fetch_filtered(title=title) 
-        except Exception as e:
-            return jsonify({'summary': f'Lookup error: {e}'}), 500
+        pub = pub_lookup.by_title.get(normalize_str(title))
+        if pub is not None:
+            pmcid, text_to_summarize = pub['Pmcid'], pub_summary_text(pub)
+        else:
+            # not an exact title, fall back to a substring match in the DB
+            try:
+                title_matches = db.fetch_filtered(title=title) 
+            except Exception as e:
+                return None, None, f'Lookup error: {e}', 500
 
-        if not title_matches:
-            return jsonify({'summary': 'Publication not found.'}), 404
+            if not title_matches:
+                return None, None, 'Publication not found.', 404
 
-        record = title_matches[0] 
-        text_to_summarize = pick_text_from_record(record)
+            record = title_matches[0] 
+            pmcid, text_to_summarize = record['pmcid'], pick_summary_text(record)
         if not text_to_summarize:
-            return jsonify({'summary': 'Unable to summarize.'})
-
-        try:
-            tokens = len(text_to_summarize.split())
-            DMAXLEN = min(tokens, SUMMARIZATION_MAX_LEN)
-            DMINLEN = max(int(DMAXLEN * 0.5), SUMMARIZATION_MIN_LEN) + 5
-            DMINLEN = min(DMINLEN, DMAXLEN)
-            summary = summarizer(
-                text_to_summarize,
-                min_length=DMINLEN,
-                max_length=DMAXLEN,
-                do_sample=False
-            )[0]['summary_text']
-            return jsonify({'summary': summary})
-        except Exception as e:
-            return jsonify({'summary': f"Summary unavailable: {e}"})
+            return None, None, 'Unable to summarize.', 200
+        return pmcid, text_to_summarize, None, None
 
     if not isinstance(pub_id, int):
-        return jsonify({'summary': 'Invalid or missing publication ID'}), 400
+        return None, None, 'Invalid or missing publication ID', 400
 
-    pub = next((p for p in publications if p['id'] == pub_id), None)
+    pub = pub_lookup.by_id.get(pub_id)
     if not pub:
-        return jsonify({'summary': 'Publication not found.'}), 404
+        return None, None, 'Publication not found.', 404
 
-    text_to_summarize = pub.get('Abstract', '') or None
+    text_to_summarize = pub_summary_text(pub)
     if not text_to_summarize:
-        sections = pub.get('Sections')
-        if sections and isinstance(sections, dict):
-            all_paragraphs = [
-                (name, text)
-                for name, text in sections.items()
-                if isinstance(text, str) and text.strip()
-            ]
-            if all_paragraphs:
-                smallest_section = min(all_paragraphs, key=lambda x: len(x[1]))
-                text_to_summarize = smallest_section[1]
-            else:
-                return jsonify({'summary': 'Unable to summarize.'})
-        else:
-            return jsonify({'summary': 'Unable to summarize.'})
+        return None, None, 'Unable to summarize.', 200
+    return pub['Pmcid'], text_to_summarize, None, None
+
+
+@app.route('/api/summary', methods=['POST'])
+def get_summary():
+    data = request.get_json() or {}
+    title = (data.get('title') or "").strip()
+    pub_id = data.get('pub_id')
+
+    pmcid, text_to_summarize, error, status = summary_source(title, pub_id)
+    if error:
+        return jsonify({'summary': error}), status
 
     try:
-        tokens = len(text_to_summarize.split())
-        DMAXLEN = min(tokens, SUMMARIZATION_MAX_LEN)
-        DMINLEN = max(int(DMAXLEN * 0.5), SUMMARIZATION_MIN_LEN) + 5
-        DMINLEN = min(DMINLEN, DMAXLEN)
-        summary = summarizer(
-            text_to_summarize,
-            min_length=DMINLEN,
-            max_length=DMAXLEN,
-            do_sample=False
-        )[0]['summary_text']
+        summary = summarize(pmcid, text_to_summarize)
         return jsonify({'summary': summary})
     except Exception as e:
         return jsonify({'summary': f"Summary unavailable: {e}"})
 
 
+def sse_event(event, payload):
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+
+def summary_events(pmcid, text):
+    """
+    SSE events for one summary: 'token' pieces while generating, then 'done' with the full text.
+    A cached summary (beam search first, else an earlier streamed one) is sent as a single
+    'done'. Long inputs are map-reduced and only the final (reduce) pass is streamed.
+    At most SUMMARY_STREAM_CONCURRENCY generations run at once; past that a 503 'failure' is sent.
+    """
+    try:
+        plan = summary_planner.get().plan(text)
+        for cache_model in (SUMMARY_CACHE_MODEL, SUMMARY_STREAM_CACHE_MODEL):
+            summary = summary_cache.get(pmcid, text, cache_model, plan.min_length, plan.max_length)
+            if summary is not None:
+                yield sse_event('done', {'summary': summary, 'cached': True})
+                return
+
+        if not summary_stream_slots.acquire(blocking=False):
+            yield sse_event('failure', {'summary': "Too many summaries in progress, please try again shortly.",
+                                        'status': 503})
+            return
+        try:
+            if len(plan.chunks) > 1:
+                partials = summary_batcher.summarize_many(plan.chunks)
+                source, min_length, max_length = " ".join(partials), plan.min_length, plan.max_length
+            else:
+                source, min_length, max_length = plan.chunks[0]
+
+            pieces = []
+            # closed explicitly so a disconnected client stops the generation right away
+            with closing(stream_summary(summarizer.get(), source, min_length, max_length)) as stream:
+                for piece in stream:
+                    pieces.append(piece)
+                    yield sse_event('token', {'text': piece})
+        finally:
+            summary_stream_slots.release()
+        summary = "".join(pieces).strip()
+        summary_cache.put(pmcid, text, SUMMARY_STREAM_CACHE_MODEL, plan.min_length, plan.max_length, summary)
+        yield sse_event('done', {'summary': summary, 'cached': False})
+    except Exception as e:
+        yield sse_event('failure', {'summary': f"Summary unavailable: {e}"})
+
+
+@app.route('/api/summary/stream', methods=['GET'])
+def stream_summary_endpoint():
+    title = (request.args.get('title') or "").strip()
+    pub_id = request.args.get('pub_id', type=int)
+
+    pmcid, text_to_summarize, error, status = summary_source(title, pub_id)
+    if error:
+        # EventSource only reads 200 text/event-stream responses, so the message goes in a 'failure' event
+        events = iter([sse_event('failure', {'summary': error, 'status': status})])
+    else:
+        events = stream_with_context(summary_events(pmcid, text_to_summarize))
+    return Response(events, mimetype='text/event-stream', headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+
+def name_list(value, lower=False):
+    """Authors / Keywords / Publisher as a list of stripped names, whether stored as a list or a comma string"""
+    if isinstance(value, str):
+        value = value.split(",")
+    elif not isinstance(value, (list, tuple)):
+        return []
+    names = [v.strip() for v in value if isinstance(v, str) and v.strip()]
+    return [n.lower() for n in names] if lower else names
+
+
+def chart_article(pub):
+    return {
+        "id": pub["id"],
+        "Title": pub["Title"],
+        "Authors": pub["Authors"],
+        "Publisher": pub.get("Publisher") or [],
+        "Pmcid": pub["Pmcid"],
+        "PublicationDate": pub["PublicationDate"],
+        "Keywords": pub["Keywords"],
+        "Image": pub["Image"],
+    }
 
-@app.route("/api/charts", methods=["POST"])
-def charts_data():
-    if not publications:
-        return jsonify({
-            "years": [], 
-            "categories": [], 
-            "authors": [],
-            "articles": []
-        })
 
-    years = []
+def build_charts(publications):
+    """
+    Chart aggregates, the article ids behind every charted bar (drill-down) and a version
+    hash of both plus the article projection; computed once per loaded corpus.
+    """
+    years, publishers, categories, authors = Counter(), Counter(), Counter(), Counter()
     for pub in publications:
         pub_date = pub.get("PublicationDate")
         if pub_date and pub_date[:4].isdigit():
-            years.append(int(pub_date[:4]))
-    year_counts = Counter(years)
-    years_data = [{"year": y, "count": year_counts[y]} for y in sorted(year_counts.keys())]
+            years[int(pub_date[:4])] += 1
+        publishers.update(name_list(pub.get("Publisher")))
+        categories.update(name_list(pub.get("Keywords"), lower=True))
+        authors.update(name_list(pub.get("Authors")))
+
+    payload = {
+        "years": [{"year": y, "count": years[y]} for y in sorted(years)],
+        "categories": [{"category": k, "count": c} for k, c in categories.most_common(CHART_TOP_CATEGORIES)],
+        "authors": [{"author": a, "count": c} for a, c in authors.most_common(CHART_TOP_AUTHORS)],
+        "publishers": [{"publisher": p, "count": c} for p, c in publishers.most_common(CHART_TOP_PUBLISHERS)],
+        "articles_total": len(publications),
+    }
 
-    publisher_counter = Counter()
+    # same matching the page used to do client-side: year prefix, case-insensitive
+    # keyword/author equality, publisher substring
+    drilldown = {
+        "year": {str(r["year"]): [] for r in payload["years"]},
+        "category": {r["category"]: [] for r in payload["categories"]},
+        "author": {r["author"].lower(): [] for r in payload["authors"]},
+        "publisher": {r["publisher"].lower(): [] for r in payload["publishers"]},
+    }
     for pub in publications:
-        pubs = pub.get("Publisher") or []
-        if isinstance(pubs, str):
-            pubs = [p.strip() for p in pubs.split(",") if p.strip()]
-        for p in pubs:
-            publisher_counter[p] += 1
-    top_publishers = publisher_counter.most_common(15)  # top 15
-    publishers_data = [{"publisher": name, "count": count} for name, count in top_publishers]
-
-    kw_counter = Counter()
+        year = (pub.get("PublicationDate") or "")[:4]
+        if year in drilldown["year"]:
+            drilldown["year"][year].append(pub["id"])
+        for keyword in set(name_list(pub.get("Keywords"), lower=True)):
+            if keyword in drilldown["category"]:
+                drilldown["category"][keyword].append(pub["id"])
+        for author in set(name_list(pub.get("Authors"), lower=True)):
+            if author in drilldown["author"]:
+                drilldown["author"][author].append(pub["id"])
+        pub_publishers = name_list(pub.get("Publisher"), lower=True)
+        for publisher, ids in drilldown["publisher"].items():
+            if any(publisher in p for p in pub_publishers):
+                ids.append(pub["id"])
+
+    digest = hashlib.sha1(json.dumps(payload, sort_keys=True).encode())
     for pub in publications:
-        keywords = pub.get("Keywords") or []
-        if isinstance(keywords, str):
-            arr = [k.strip().lower() for k in keywords.split(",") if k.strip()]
-        elif isinstance(keywords, (list, tuple)):
-            arr = [k.strip().lower() for k in keywords if isinstance(k, str) and k.strip()]
-        else:
-            arr = []
-        for k in arr:
-            kw_counter[k] += 1
-    top_categories = kw_counter.most_common(20)
-    categories_data = [{"category": name, "count": count} for name, count in top_categories]
+        digest.update(json.dumps(chart_article(pub), sort_keys=True, default=str).encode())
+    payload["version"] = digest.hexdigest()[:16]
+    return payload, drilldown
 
-    author_counter = Counter()
-    for pub in publications:
-        authors = pub.get("Authors") or []
-        if isinstance(authors, str):
-            arr = [a.strip() for a in authors.split(",") if a.strip()]
-        elif isinstance(authors, (list, tuple)):
-            arr = [a.strip() for a in authors if isinstance(a, str) and a.strip()]
-        else:
-            arr = []
-        for a in arr:
-            author_counter[a] += 1
-    top_authors = author_counter.most_common(15)
-    authors_data = [{"author": name, "count": count} for name, count in top_authors]
-
-    articles_data = [
-        {
-            "id": pub["id"],
-            "Title": pub["Title"],
-            "Authors": pub["Authors"],
-            "Publisher": pub.get("Publisher") or [],  # <-- ADD THIS
-            "Pmcid": pub["Pmcid"],
-            "PublicationDate": pub["PublicationDate"],
-            "Keywords": pub["Keywords"],
-            "Image": pub["Image"],
-        }
-        for pub in publications
-    ]
 
+def conditional_json(body, version):
+    """JSON response with a weak ETag (so compression does not change it) that answers If-None-Match with 304"""
+    resp = jsonify(body)
+    resp.set_etag(version, weak=True)
+    resp.headers["Cache-Control"] = "no-cache"  # always revalidate, a 304 is a few bytes
+    return resp.make_conditional(request)
 
-    return jsonify({
-        "years": years_data,
-        "categories": categories_data,
-        "authors": authors_data,
-        "publishers": publishers_data, 
-        "articles": articles_data
-    })
+
+def charts_page_etag(filter_type, value, page, per_page):
+    # the filter value is user input (quotes, non-Latin-1 names), so only its hash goes into the header
+    query = hashlib.sha1(f"{filter_type}|{value.lower()}|{page}|{per_page}".encode("utf-8")).hexdigest()[:16]
+    return f"{charts_payload['version']}-{query}"
+
+
+@app.route("/api/charts", methods=["GET"])
+def charts_data():
+    """chart aggregates; the article table and drill-downs are paged from /api/charts/articles"""
+    return conditional_json(charts_payload, charts_payload["version"])
+
+
+@app.route("/api/charts/articles", methods=["GET"])
+def charts_articles():
+    """
+    ?filter=year|category|author|publisher&value=V -> articles behind one chart bar
+    (no filter -> every article); paged with page / per_page
+    """
+    filter_type = request.args.get("filter")
+    value = (request.args.get("value") or "").strip()
+    page = max(1, request.args.get("page", 1, type=int))
+    per_page = min(max(1, request.args.get("per_page", CHART_ARTICLES_PER_PAGE, type=int)), CHART_ARTICLES_PER_PAGE)
+
+    if filter_type:
+        if filter_type not in charts_drilldown:
+            return jsonify({"error": f"Unknown filter, expected one of {sorted(charts_drilldown)}"}), 400
+        ids = charts_drilldown[filter_type].get(value if filter_type == "year" else value.lower(), [])
+    else:
+        ids = range(len(publications))
+
+    start = (page - 1) * per_page
+    return conditional_json({
+        "articles": [chart_article(publications[i]) for i in ids[start:start + per_page]],
+        "page": page,
+        "total": len(ids),
+        "per_page": per_page,
+    }, charts_page_etag(filter_type, value, page, per_page))
 
 
 @app.route("/api/kg", methods=["POST"])
@@ -334,10 +519,15 @@ def knowledge_graph():
       2) { "author": "Author Name" } -> returns author node + their article nodes + edges
       3) { "keywords": [...] } -> returns keyword -> article nodes
       4) { "title": "Article Title" } -> returns article node + all its authors and keywords
+      5) { "node": "author_x", "hops": 2 } -> k-hop neighborhood of any node id
+      6) { "coauthors": "Author Name", "limit": N } -> author + co-authors, edges weighted by shared articles
+      7) { "cooccurring": "keyword", "limit": N } -> keyword + keywords sharing articles with it
+      8) { "central": "all" | "article" | "author" | "keyword", "limit": N } -> most central nodes, their most central neighbors + edges among them
+      9) { "related": N, "limit": M } -> article N + its related articles
+     10) { "community": "author_x", "limit": N } -> most central nodes of that node's community
     """
     data = request.get_json() or {}
     nodes, edges, node_ids = [], [], set()
-    print(data)
     
     def add_author_node(author_name, article_id=None, edge_label="WRITTEN_BY"):
         clean_author = re.sub(r'\W+', '_', author_name.lower()).strip('_')
@@ -383,15 +573,48 @@ def knowledge_graph():
             "Pmcid": pub.get("Pmcid"),
             "Link": pub.get("Link"),
             "Publisher": pubs,
-            "Abstract": pub.get("Abstract"),
-            "Sections": pub.get("Sections"),
             "Pdf": pub.get("Pdf"),
-            "Images": pub.get("Images"),
             "Image": pub.get("Image"),
             "PubDate": pub.get("PublicationDate")
 
         }
 
+    def add_graph_node(node):
+        group = kg.groups[node]
+        if group == kg.ARTICLE:
+            return add_article_node(publications[node])
+        key = kg.keys[node]
+        if key not in node_ids:
+            nodes.append({"id": key, "label": kg.labels[node], "group": kg.GROUPS[group]})
+            node_ids.add(key)
+        return key
+
+    def add_related(node, related, edge_label):
+        # related: (node, shared article count) pairs from kg.co_occurring
+        center = add_graph_node(node)
+        for other, weight in related:
+            edges.append({"from": center, "to": add_graph_node(other), "label": edge_label, "value": weight})
+        return jsonify({"nodes": nodes, "edges": edges})
+
+    def add_graph_edge(a, b):
+        # edges point into the article, as in the other modes
+        if kg.groups[a] == kg.ARTICLE:
+            a, b = b, a
+        edges.append({"from": kg.keys[a], "to": kg.keys[b],
+                      "label": "WRITTEN_BY" if kg.groups[a] == kg.AUTHOR else "HAS"})
+
+    def add_subgraph(members):
+        # precomputed analytics travel with the nodes so the UI can size/colour them
+        for node in members:
+            add_graph_node(node)
+        for a, b in kg.induced_edges(members):
+            add_graph_edge(a, b)
+        for n in nodes:
+            node = kg.node(n["id"])
+            n["centrality"] = float(kg.centrality[node])
+            n["community"] = int(kg.community[node])
+        return jsonify({"nodes": nodes, "edges": edges})
+
     # 1) By article_id
     article_id = data.get("article_id")
     if article_id is not None:
@@ -399,15 +622,12 @@ def knowledge_graph():
             article_id = int(article_id)
         except:
             return jsonify({"nodes": [], "edges": [], "article": None})
-        pub = next((p for p in publications if p["id"] == article_id), None)
+        pub = pub_lookup.by_id.get(article_id)
         if not pub:
             return jsonify({"nodes": [], "edges": [], "article": None})
         art_id = add_article_node(pub)
-        authors_raw = pub.get("Authors") or []
-        authors_list = re.split(r'[,;]+', authors_raw) if isinstance(authors_raw, str) else authors_raw
-        for a in authors_list:
-            if isinstance(a, str) and a.strip():
-                add_author_node(a.strip(), article_id=pub["id"])
+        for _, author in kg.linked(pub["id"], kg.AUTHOR):
+            add_author_node(author, article_id=pub["id"])
         return jsonify({
             "nodes": nodes,
             "edges": edges,
@@ -417,59 +637,44 @@ def knowledge_graph():
     # 2) By author
     author_q = data.get("author") or data.get("author_name")
     if author_q:
-        qnorm = normalize_str(author_q)
-        clean_author = re.sub(r'\W+', '_', author_q.lower()).strip('_')
-        author_id = f"author_{clean_author}"
+        author_id = author_node_id(author_q)
         if author_id not in node_ids:
             nodes.append({"id": author_id, "label": author_q, "group": "author"})
             node_ids.add(author_id)
-        for pub in publications:
-            pub_auths = pub.get("Authors") or []
-            pub_auths_list = re.split(r'[,;]+', pub_auths) if isinstance(pub_auths, str) else pub_auths
-            pub_auths_list = [a.strip() for a in pub_auths_list if isinstance(a, str) and a.strip()]
-            if any(normalize_str(a) == qnorm for a in pub_auths_list):
-                art_id = add_article_node(pub)
-                edges.append({"from": author_id, "to": art_id, "label": "WROTE"})
-                edges.append({"from": art_id, "to": author_id, "label": "WRITTEN_BY"})
+        author = kg.node(author_id)
+        for art in (kg.neighbors(author, kg.ARTICLE).tolist() if author is not None else []):
+            art_id = add_article_node(publications[art])
+            edges.append({"from": author_id, "to": art_id, "label": "WROTE"})
+            edges.append({"from": art_id, "to": author_id, "label": "WRITTEN_BY"})
         return jsonify({"nodes": nodes, "edges": edges})
 
     # 3) By keywords
     selected_keywords = [k for k in data.get("keywords", []) if isinstance(k, str)]
     for kw in selected_keywords:
-        kw_norm = kw.lower()
-        kw_id = f"keyword_{kw_norm}"
+        kw_id = keyword_node_id(kw)
         if kw_id not in node_ids:
             nodes.append({"id": kw_id, "label": kw, "group": "keyword"})
             node_ids.add(kw_id)
-        for pub in publications:
-            pub_keywords = pub.get("Keywords") or []
-            pub_keywords_list = re.split(r',', pub_keywords) if isinstance(pub_keywords, str) else pub_keywords
-            pub_keywords_list = [k.strip().lower() for k in pub_keywords_list if isinstance(k, str) and k.strip()]
-            if kw_norm in pub_keywords_list:
-                art_id = add_article_node(pub)
-                edges.append({"from": kw_id, "to": art_id, "label": "HAS"})
+        keyword = kg.node(kw_id)
+        for art in (kg.neighbors(keyword, kg.ARTICLE).tolist() if keyword is not None else []):
+            art_id = add_article_node(publications[art])
+            edges.append({"from": kw_id, "to": art_id, "label": "HAS"})
     if selected_keywords:
         return jsonify({"nodes": nodes, "edges": edges})
 
     # 4) By article title
     title_q = data.get("title")
     if title_q:
-        tnorm = normalize_str(title_q)
-        pub = next((p for p in publications if normalize_str(p.get("Title") or "") == tnorm), None)
+        pub = pub_lookup.by_title.get(normalize_str(title_q))
         if not pub:
             return jsonify({"nodes": [], "edges": [], "article": None})
         art_id = add_article_node(pub)
-        authors_raw = pub.get("Authors") or []
-        authors_list = re.split(r'[,;]+', authors_raw) if isinstance(authors_raw, str) else authors_raw
-        authors_list = [a.strip() for a in authors_list if isinstance(a, str) and a.strip()]
-        for a in authors_list:
-            add_author_node(a, article_id=pub["id"])
-        kws = pub.get("Keywords") or []
-        kws = [k.strip() for k in kws.split(",")] if isinstance(kws, str) else kws
-        for k in kws:
-            kw_id = f"keyword_{k.lower()}"
+        for _, author in kg.linked(pub["id"], kg.AUTHOR):
+            add_author_node(author, article_id=pub["id"])
+        for keyword, spelling in kg.linked(pub["id"], kg.KEYWORD):
+            kw_id = kg.keys[keyword]
             if kw_id not in node_ids:
-                nodes.append({"id": kw_id, "label": k, "group": "keyword"})
+                nodes.append({"id": kw_id, "label": spelling, "group": "keyword"})
                 node_ids.add(kw_id)
             edges.append({"from": kw_id, "to": art_id, "label": "HAS"})
         return jsonify({
@@ -478,6 +683,68 @@ def knowledge_graph():
             "article": format_article(pub)
         })
 
+    # 5) k-hop expansion around any node
+    node_q = data.get("node")
+    if isinstance(node_q, str) and kg.node(node_q) is not None:
+        hops = bounded(data.get("hops"), 1, KG_MAX_HOPS)
+        order, hop_edges = kg.k_hop(kg.node(node_q), hops, KG_MAX_FANOUT, KG_MAX_NODES)
+        for node in order:
+            add_graph_node(node)
+        for a, b in hop_edges:
+            add_graph_edge(a, b)
+        return jsonify({"nodes": nodes, "edges": edges})
+
+    # 6) co-authorship
+    coauthor_q = data.get("coauthors")
+    if isinstance(coauthor_q, str):
+        author = kg.node(author_node_id(coauthor_q))
+        if author is None:
+            return jsonify({"nodes": [], "edges": []})
+        limit = bounded(data.get("limit"), KG_MAX_FANOUT, KG_MAX_FANOUT)
+        return add_related(author, kg.co_occurring(author, limit), "COAUTHOR")
+
+    # 7) keyword co-occurrence
+    cooccur_q = data.get("cooccurring")
+    if isinstance(cooccur_q, str):
+        keyword = kg.node(keyword_node_id(cooccur_q.strip()))
+        if keyword is None:
+            return jsonify({"nodes": [], "edges": []})
+        limit = bounded(data.get("limit"), KG_MAX_FANOUT, KG_MAX_FANOUT)
+        return add_related(keyword, kg.co_occurring(keyword, limit), "CO_OCCURS")
+
+    # 8) most central nodes, optionally of one group ("article", "author", "keyword")
+    central_q = data.get("central")
+    if central_q:
+        group = kg.GROUPS.index(central_q) if central_q in kg.GROUPS else None
+        limit = bounded(data.get("limit"), MAX_INITIAL_NODES, KG_MAX_NODES)
+        members = []
+        for node in kg.top_central(limit, group=group).tolist():
+            members.append(node)
+            members.extend(kg.top_neighbors(node, KG_CENTRAL_NEIGHBORS).tolist())
+        return add_subgraph(list(dict.fromkeys(members)))
+
+    # 9) related articles, from graph_analytics.py
+    related_q = data.get("related")
+    if related_q is not None:
+        try:
+            article = int(related_q)
+        except (TypeError, ValueError):
+            return jsonify({"nodes": [], "edges": []})
+        if article not in pub_lookup.by_id:
+            return jsonify({"nodes": [], "edges": []})
+        limit = bounded(data.get("limit"), KG_MAX_FANOUT, KG_MAX_FANOUT)
+        related = [(other, round(score, 4)) for other, score in kg.related.get(article, [])[:limit]]
+        return add_related(article, related, "RELATED")
+
+    # 10) most central members of a node's community
+    community_q = data.get("community")
+    if isinstance(community_q, str) and kg.node(community_q) is not None:
+        community = int(kg.community[kg.node(community_q)])
+        if community < 0:
+            return jsonify({"nodes": [], "edges": []})
+        limit = bounded(data.get("limit"), MAX_INITIAL_NODES, KG_MAX_NODES)
+        return add_subgraph(kg.top_central(limit, community=community).tolist())
+
     return jsonify({"nodes": [], "edges": []})
 
 
@@ -527,9 +794,9 @@ def CompletenessScore(article):
     """weighted completeness score prioritizing images > abstract > sections > PDF"""
     score = 0
     # high priority
-    score += 5 if article.get('images') and len(article['images']) > 0 else 0
-    score += 4 if article.get('abstract') else 0
-    score += 3 if article.get('sections') else 0
+    score += 5 if article.get('image') else 0
+    score += 4 if article.get('has_abstract') else 0
+    score += 3 if article.get('has_sections') else 0
     score += 2 if article.get('Pdf_URL') else 0
     # medium/low priority
     score += 1 if article.get('title') else 0
@@ -539,67 +806,15 @@ def CompletenessScore(article):
     score += 1 if article.get('publication_date') else 0
     return score
 
-def ProcessSweetArticles(all_articles, error_img, CompletenessScore, debug=False):
+def ProcessSweetArticles(all_articles, error_img, CompletenessScore, text_loader, debug=False):
+    """catalog rows (PMCDatabase.fetch_catalog) -> PublicationStore in completeness order, facet lists and stats"""
     random.shuffle(all_articles)
     ordered_articles = sorted(all_articles, key=CompletenessScore, reverse=True)
 
-    abstract_count, sections_only_count, no_content_count = 0, 0, 0
-    publications = []
-    all_keywords = set()
-    all_authors = set()
-    all_years = set()
-    all_publisher = set()
-    for idx, article in enumerate(ordered_articles):
-        if article.get('abstract'):
-            abstract_count += 1
-        elif not article.get('abstract') and article.get('sections'):
-            sections_only_count += 1
-        else:
-            no_content_count += 1
-
-        has_images = bool(article.get('images'))
-        chosen_image = article['images'][0] if has_images else error_img
-        pubs_item = {
-            'id': idx,
-            'Title': article.get('title', '').replace("▿", "") or 'Untitled',
-            'Link': f"https://www.ncbi.nlm.nih.gov/pmc/articles/{article.get('pmcid','')}/",
-            'Authors': article.get('authors'),
-            'Publisher': article.get("publisher"),
-            'Pmcid': article.get('pmcid'),
-            'Keywords': article.get('keywords'),
-            'Abstract': article.get('abstract') or 'Error in summary',
-            'Sections': article.get('sections'),
-            'PublicationDate': article.get('publication_date'),
-            'Restricted': article.get('restricted'),
-            'Images': article.get('images'),
-            'Image': chosen_image,
-            'Pdf': article.get('Pdf_URL'),
-            'Default_Img_Found': False if has_images else True,
-        }
-
-        kws = pubs_item.get('Keywords') or []
-        if isinstance(kws, str):
-            kws = [k.strip() for k in kws.split(",") if k.strip()]
-        all_keywords.update(kws)
-
-        authors = pubs_item.get('Authors') or []
-        if isinstance(authors, str):
-            authors = [a.strip() for a in authors.split(",") if a.strip()]
-        all_authors.update(authors)
-
-        date = pubs_item.get('PublicationDate')
-        if date and date[:4].isdigit():
-            all_years.add(int(date[:4]))
-        
-        publs = pubs_item.get('Publisher') or []
-        if isinstance(publs, str):
-            publs = [p.strip() for p in publs.split(",") if p.strip()]
-        all_publisher.update(publs)
-
-        all_publisher.update(publs)
-        publications.append(pubs_item)
-
-
+    abstract_count = sum(1 for article in ordered_articles if article['has_abstract'])
+    sections_only_count = sum(1 for article in ordered_articles if not article['has_abstract'] and article['has_sections'])
+    no_content_count = len(ordered_articles) - abstract_count - sections_only_count
+    publications = PublicationStore(ordered_articles, text_loader, error_img, NO_ABSTRACT)
 
     total_articles = len(ordered_articles)
     summarizable_count = abstract_count + sections_only_count
@@ -643,21 +858,133 @@ def ProcessSweetArticles(all_articles, error_img, CompletenessScore, debug=False
         print(f"Total summarizable articles: {summarizable_count} ({(summarizable_count/total_articles)*100:.2f}%)")
         print(f"Total unsummarizable articles: {unsummarizable_count} ({(unsummarizable_count/total_articles)*100:.2f}%)")
         print(f"Total unsummarizable articles when we didn't add sections: {unsummarizable_before_sections} ({(unsummarizable_before_sections/total_articles)*100:.2f}%)")
-    return publications, sorted(list(all_keywords)), sorted(list(all_authors)), sorted(list(all_publisher)), sorted(list(all_years)), stats
+    facet_index = FacetIndex(publications)
+    return (publications, publications.sorted_keywords(), publications.sorted_authors(), publications.sorted_publishers(),
+            publications.sorted_years(), stats, facet_index)
 
-def main():
-    global publications, db, all_keywords, all_years, all_authors, all_publisher  
+def load_corpus(warm_up=WARM_UP_MODELS):
+    """DB, publications and every index the routes read; the models only start loading here with warm_up"""
+    global publications, pub_lookup, kg, facet_index, charts_payload, charts_drilldown, embeddings, embedding_pub_ids, db, summary_cache, all_keywords, all_years, all_authors, all_publisher  
     error_img = "https://images.unsplash.com/photo-1610296669228-602fa827fc1f?..."
+    profile_stage('app setup')
+    if warm_up:
+        summary_planner.warm_up()
+        summarizer.warm_up()
 
     db = PMCDatabase(DBFILE)
-    all_articles = db.fetch_filtered()
+    summary_cache = SummaryCache(db, capacity=SUMMARY_CACHE_SIZE)
+    all_articles = db.fetch_catalog()
+    profile_stage('load articles')
     
-    publications, all_keywords, all_authors, all_publisher, all_years, info_stats = ProcessSweetArticles(all_articles, error_img, CompletenessScore, debug=DEBUG)
+    publications, all_keywords, all_authors, all_publisher, all_years, info_stats, facet_index = ProcessSweetArticles(all_articles, error_img, CompletenessScore, db.fetch_text, debug=DEBUG)
     all_keywords.append("No keywords")
+    pub_lookup = PublicationLookup(publications)
+    kg = KnowledgeGraph(publications)
+    kg.attach_analytics(*db.fetch_graph_analytics(), {pmcid: pub['id'] for pmcid, pub in pub_lookup.by_pmcid.items()})
+    charts_payload, charts_drilldown = build_charts(publications)
+    profile_stage('build publications and indexes')
+
+    embeddings = EmbeddingIndex.load(DBFILE)
+    if embeddings is None or embeddings.model != SENTENCE_MODEL_NAME:
+        embeddings = None
+        print("[DEBUG] No embedding index for this DB, semantic search falls back to keyword "
+              "(build it with PMCPipeline.update_embeddings)")
+    else:
+        embedding_pub_ids = np.array([pub_lookup.by_pmcid[p]['id'] if p in pub_lookup.by_pmcid else -1
+                                      for p in embeddings.pmcids], dtype=np.int64)
+        if warm_up:
+            SENTENCE_MODEL.warm_up()
+    profile_stage('load embeddings')
     print(publications[0])
 
     print(f'publishers: {all_publisher}, total publishers: {len(all_publisher)}')
 
+    total_startup = sum(startup_profile.values())
+    for stage, seconds in startup_profile.items():
+        print(f"[DEBUG] startup {stage:<32} {seconds:7.3f} sec")
+    print(f"[DEBUG] startup total {total_startup:.3f} sec (target {STARTUP_TARGET_SECONDS:.1f} sec)")
+    if total_startup > STARTUP_TARGET_SECONDS:
+        print(f"[ERROR] Cold start {total_startup:.2f} sec is over the {STARTUP_TARGET_SECONDS:.1f} sec target, "
+              f"run `python -X importtime app.py` for a per-module breakdown")
+
+
+def preload_models():
+    """load the models in the gunicorn master so the workers share their weights instead of loading a copy each"""
+    try:
+        import torch
+        torch.set_num_threads(1)  # no intra-op thread pool in the master, it would not survive fork
+    except ImportError:
+        pass
+    models = [summary_planner, summarizer] + ([SENTENCE_MODEL] if embeddings is not None else [])
+    for model in models:
+        try:
+            model.get()
+        except Exception:
+            pass  # reported by /api/ready and retried by the workers on first use
+
+
+def after_fork(server, worker):
+    """gunicorn post_fork hook"""
+    torch = sys.modules.get('torch')
+    if torch is not None:
+        # split the cores between the workers instead of every worker using all of them
+        torch.set_num_threads(max(1, (os.cpu_count() or 1) // server.cfg.workers))
+    if SERVE_SUMMARIZER == 'lazy' and WARM_UP_MODELS:
+        summary_planner.warm_up()
+        summarizer.warm_up()
+
+
+def serve_production(workers=SERVE_WORKERS, threads=SERVE_THREADS):
+    """
+    Preforking gunicorn server (gthread workers). Everything is loaded here, in the master,
+    before the workers are forked, so they share the corpus and index pages copy-on-write.
+    """
+    from gunicorn.app.base import BaseApplication
+
+    class ProductionServer(BaseApplication):
+        def load_config(self):
+            for key, value in options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return app
+
+    options = {
+        'bind': f'{HOST}:{PORT}',
+        'workers': workers,
+        'threads': threads,
+        'worker_class': 'gthread',
+        'timeout': SERVE_TIMEOUT,
+        'preload_app': True,
+        'post_fork': after_fork,
+    }
+    app.config['TEMPLATES_AUTO_RELOAD'] = False
+    load_corpus(warm_up=False)
+    if SERVE_SUMMARIZER == 'shared':
+        preload_models()
+    db.close()  # SQLite connections must not cross fork, every worker thread opens its own
+    gc.freeze()  # keep the collector from writing to (and so un-sharing) the preloaded objects
+    print(f"[DEBUG] Serving on {HOST}:{PORT} with {workers} worker(s) x {threads} thread(s), summarizer {SERVE_SUMMARIZER}")
+    ProductionServer().run()
+
+
+def main():
+    global DBFILE, HOST, PORT
+    parser = argparse.ArgumentParser(description=TITLE)
+    parser.add_argument('--production', action='store_true', help='preforking gunicorn server instead of the dev server')
+    parser.add_argument('--workers', type=int, default=SERVE_WORKERS)
+    parser.add_argument('--threads', type=int, default=SERVE_THREADS)
+    parser.add_argument('--host', default=HOST)
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--db', default=DBFILE)
+    args = parser.parse_args()
+    DBFILE, HOST, PORT = args.db, args.host, args.port
+
+    if args.production:
+        serve_production(args.workers, args.threads)
+        return
+
+    load_corpus()
     if ENABLE_LIVERELOAD :
         from livereload import Server
         server = Server(app.wsgi_app)
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Benchmark: per-article parse time of the PMC article page, BeautifulSoup (old path)
+vs the ArticlePage tag scanner (new path), and a check that both give the same
+images / Pdf_URL.
+
+Pages are read from the HTTP cache when one exists, otherwise fetched once from PMC
+for the first --limit articles in the DB.
+
+    python benchmarks/html_extract.py --limit 50 --repeat 5
+"""
+
+import os
+import sys
+import time
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from bs4 import BeautifulSoup
+from pmc_toolkit import PMCDatabase, PMCMetadataFetcher, ArticlePage, ResponseCache
+
+
+def soup_images(soup) -> list:
+    images = []
+    for img in (soup.find_all("img", class_="graphic") + soup.find_all("img", class_="graphic zoom-in")):
+        src = img.get("src") or img.get("data-src")
+        if not src:
+            continue
+        if src.startswith("//"):
+            src = "https:" + src
+        elif src.startswith("/"):
+            src = "https://www.ncbi.nlm.nih.gov" + src
+        if any(src.lower().endswith(ext) for ext in (".jpg", ".jpeg", ".png", ".gif", ".tif", ".tiff")):
+            images.append(src)
+    return list(dict.fromkeys(images))
+
+
+def soup_pdf_url(soup):
+    tag = soup.find("meta", {"name": "citation_pdf_url"})
+    if tag:
+        pdf = tag.get("content")
+        if pdf and pdf.startswith("/"):
+            pdf = f"https://www.ncbi.nlm.nih.gov{pdf}"
+        return pdf
+    return None
+
+
+def old_extract(html_text: str):
+    soup = BeautifulSoup(html_text, "html.parser")
+    return soup_images(soup), soup_pdf_url(soup)
+
+
+def new_extract(html_text: str):
+    page = ArticlePage.from_html(html_text)
+    fetcher = PMCMetadataFetcher("")
+    return fetcher.fetch_images_from_page(page), fetcher.fetch_pdf_url_from_page(page)
+
+
+def time_per_article(fn, pages, repeat: int) -> list:
+    timings = []
+    for html_text in pages:
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn(html_text)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        timings.append(best)
+    return timings
+
+
+def load_pages(db_file: str, cache_dir: str, limit: int) -> list:
+    if cache_dir and os.path.isdir(cache_dir):
+        PMCMetadataFetcher.CACHE = ResponseCache(cache_dir)
+    pmcids = [a["pmcid"] for a in PMCDatabase(db_file).fetch_filtered()][:limit]
+    pages = []
+    for pmcid in pmcids:
+        url = f"https://www.ncbi.nlm.nih.gov/pmc/articles/{pmcid}/"
+        try:
+            resp = PMCMetadataFetcher.http_get(url)
+            resp.raise_for_status()
+            pages.append(resp.text)
+        except Exception as e:
+            print(f"[DEBUG] Skipping {pmcid}: {e}")
+    return pages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", default="pmc_articles_csv_metadata.db")
+    parser.add_argument("--cache-dir", default="http_cache")
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    pages = load_pages(args.db, args.cache_dir, args.limit)
+    if not pages:
+        print("[ERROR] No article pages to benchmark")
+        raise SystemExit(1)
+
+    mismatches = sum(1 for html_text in pages if old_extract(html_text) != new_extract(html_text))
+    old_t = time_per_article(old_extract, pages, args.repeat)
+    new_t = time_per_article(new_extract, pages, args.repeat)
+
+    print(f"articles: {len(pages)}, avg page size: {statistics.mean(len(p) for p in pages) / 1024:.1f} KiB")
+    print(f"BeautifulSoup html.parser : median {statistics.median(old_t) * 1000:8.2f} ms/article, "
+          f"total {sum(old_t):.2f} s")
+    print(f"ArticlePage tag scanner   : median {statistics.median(new_t) * 1000:8.2f} ms/article, "
+          f"total {sum(new_t):.2f} s")
+    print(f"speedup: {sum(old_t) / sum(new_t):.1f}x, result mismatches: {mismatches}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Load test: requests/sec and latency of `app.py --production` for a range of worker
+counts, plus memory per process (USS = private, PSS = private + fair share of the
+copy-on-write pages) to show how much of the corpus the forked workers share.
+
+Each run starts the server on --db, waits for it to answer, then drives it from
+--clients client processes (keep-alive connections, one per thread) with a mix of
+search, card, detail, chart and knowledge-graph requests.
+
+    python benchmarks/load_test.py --workers 1 2 4 --threads 8 --duration 15
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import statistics
+import subprocess
+import http.client
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
+
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+QUERIES = ["bone", "muscle atrophy", "microgravity", "radiation", "arabidopsis", "spaceflight mice", "immune", "stem cells"]
+
+
+def request_mix(rng: random.Random, max_id: int):
+    kind = rng.random()
+    if kind < 0.35:
+        return "POST", "/api/advancedf", {"q": rng.choice(QUERIES), "page": rng.randint(1, 3)}
+    if kind < 0.55:
+        return "POST", "/api/advancedf", {"page": rng.randint(1, 10), "sort": rng.choice(["best", "newest", "oldest"])}
+    if kind < 0.75:
+        return "GET", f"/api/article/{rng.randrange(max_id)}", None
+    if kind < 0.90:
+        return "GET", "/api/charts", None
+    return "POST", "/api/kg", {"article_id": rng.randrange(max_id)}
+
+
+def client_thread(host: str, port: int, deadline: float, seed: int, max_id: int) -> list:
+    rng = random.Random(seed)
+    conn = http.client.HTTPConnection(host, port, timeout=60)
+    samples = []
+    while time.perf_counter() < deadline:
+        method, path, body = request_mix(rng, max_id)
+        data = json.dumps(body).encode() if body is not None else None
+        headers = {"Content-Type": "application/json", "Accept-Encoding": "br"} if data else {"Accept-Encoding": "br"}
+        start = time.perf_counter()
+        try:
+            conn.request(method, path, body=data, headers=headers)
+            resp = conn.getresponse()
+            resp.read()
+            ok = resp.status < 500
+        except (OSError, http.client.HTTPException):
+            ok = False
+            conn.close()
+            conn = http.client.HTTPConnection(host, port, timeout=60)
+        samples.append((time.perf_counter() - start, ok))
+    conn.close()
+    return samples
+
+
+def client_process(args) -> list:
+    host, port, duration, threads, seed, max_id = args
+    deadline = time.perf_counter() + duration
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        futures = [executor.submit(client_thread, host, port, deadline, seed * 1000 + i, max_id) for i in range(threads)]
+        return [s for f in futures for s in f.result()]
+
+
+def memory_kb(pid: int) -> dict:
+    """Pss / Private_* of one process from /proc/<pid>/smaps_rollup (Linux only)"""
+    out = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                parts = line.split()
+                if parts[0] in ("Rss:", "Pss:", "Private_Clean:", "Private_Dirty:"):
+                    out[parts[0][:-1]] = int(parts[1])
+    except OSError:
+        return {}
+    out["Uss"] = out.get("Private_Clean", 0) + out.get("Private_Dirty", 0)
+    return out
+
+
+def child_pids(pid: int) -> list:
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            return [int(p) for p in f.read().split()]
+    except OSError:
+        return []
+
+
+def wait_ready(host: str, port: int, timeout: float) -> bool:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection(host, port, timeout=5)
+            conn.request("GET", "/api/charts")
+            if conn.getresponse().status == 200:
+                return True
+        except OSError:
+            pass
+        time.sleep(0.5)
+    return False
+
+
+def run(args, workers: int) -> dict:
+    cmd = [sys.executable, "app.py", "--production", "--workers", str(workers), "--threads", str(args.threads),
+           "--host", args.host, "--port", str(args.port), "--db", args.db]
+    server = subprocess.Popen(cmd, cwd=APP_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        if not wait_ready(args.host, args.port, args.startup_timeout):
+            print(f"[ERROR] Server with {workers} worker(s) did not come up")
+            return None
+        # `app.py --production` runs the gunicorn master in-process, the workers are its children
+        master = server.pid
+        conn = http.client.HTTPConnection(args.host, args.port)
+        conn.request("GET", "/api/charts")
+        max_id = json.loads(conn.getresponse().read())["articles_total"]
+
+        jobs = [(args.host, args.port, args.duration, args.client_threads, i, max_id) for i in range(args.clients)]
+        start = time.perf_counter()
+        with multiprocessing.Pool(args.clients) as pool:
+            samples = [s for part in pool.map(client_process, jobs) for s in part]
+        elapsed = time.perf_counter() - start
+
+        memory = [memory_kb(master)] + [memory_kb(p) for p in child_pids(master)]
+        latencies = sorted(t for t, ok in samples if ok)
+        return {
+            "workers": workers,
+            "requests": len(samples),
+            "errors": sum(1 for _, ok in samples if not ok),
+            "rps": len(latencies) / elapsed,
+            "p50": latencies[len(latencies) // 2] if latencies else 0.0,
+            "p99": latencies[min(len(latencies) - 1, int(0.99 * len(latencies)))] if latencies else 0.0,
+            "worker_uss_mb": statistics.mean(m.get("Uss", 0) for m in memory[1:]) / 1024 if len(memory) > 1 else 0.0,
+            "worker_pss_mb": statistics.mean(m.get("Pss", 0) for m in memory[1:]) / 1024 if len(memory) > 1 else 0.0,
+            "total_pss_mb": sum(m.get("Pss", 0) for m in memory) / 1024,
+            "total_rss_mb": sum(m.get("Rss", 0) for m in memory) / 1024,
+        }
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", default="pmc_articles_csv_metadata.db")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--threads", type=int, default=8, help="request threads per server worker")
+    parser.add_argument("--clients", type=int, default=2, help="load generator processes")
+    parser.add_argument("--client-threads", type=int, default=8, help="connections per load generator process")
+    parser.add_argument("--duration", type=float, default=15.0)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=18080)
+    parser.add_argument("--startup-timeout", type=float, default=120.0)
+    args = parser.parse_args()
+    args.db = os.path.abspath(args.db)
+
+    print(f"cores: {os.cpu_count()}, server threads/worker: {args.threads}, "
+          f"clients: {args.clients} x {args.client_threads}, {args.duration:.0f} s per run")
+    print(f"{'workers':>7} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7} {'worker USS MB':>14} "
+          f"{'worker PSS MB':>14} {'total PSS MB':>13} {'total RSS MB':>13}")
+    for workers in args.workers:
+        r = run(args, workers)
+        if r is None:
+            continue
+        print(f"{r['workers']:>7} {r['rps']:8.1f} {r['p50'] * 1000:8.1f} {r['p99'] * 1000:8.1f} {r['errors']:>7} "
+              f"{r['worker_uss_mb']:14.1f} {r['worker_pss_mb']:14.1f} {r['total_pss_mb']:13.1f} {r['total_rss_mb']:13.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Benchmark: summarizer inference backends (fp32 PyTorch, int8 dynamic quantization,
+ONNX Runtime) on a fixed sample of articles from the DB.
+
+Each backend runs in its own process so load time and peak RSS are not mixed up.
+Reports per-article latency, peak RSS and ROUGE-1 / ROUGE-L F1 agreement of every
+backend's summaries with the fp32 PyTorch baseline.
+
+    python benchmarks/summary_backends.py --sample 20 --backends torch int8 onnx
+"""
+
+import os
+import sys
+import re
+import json
+import time
+import random
+import argparse
+import resource
+import statistics
+import subprocess
+import tempfile
+from collections import Counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from pmc_toolkit import PMCDatabase
+from summary_toolkit import (SUMMARY_BACKENDS, SUMMARY_MODEL, SummaryPlanner, load_summarization_pipeline,
+                             pick_summary_text, run_summarizer, summarize_plan)
+
+
+def sample_texts(db_file: str, sample: int, seed: int) -> list:
+    records = sorted(PMCDatabase(db_file).fetch_filtered(), key=lambda r: r["pmcid"])
+    texts = [(r["pmcid"], pick_summary_text(r)) for r in records]
+    texts = [(pmcid, text) for pmcid, text in texts if text]
+    return random.Random(seed).sample(texts, min(sample, len(texts)))
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_backend(backend: str, model: str, texts: list, threads: int) -> dict:
+    import torch
+    torch.set_num_threads(threads)
+    rss_before = peak_rss_mb()
+    start_time = time.perf_counter()
+    summarizer = load_summarization_pipeline(model, device=-1, backend=backend)
+    load_seconds = time.perf_counter() - start_time
+    planner = SummaryPlanner.from_pretrained(model)
+
+    def summarize_many(items):
+        return [run_summarizer(summarizer, [text], min_length, max_length)[0] for text, min_length, max_length in items]
+
+    latencies, summaries = [], {}
+    for pmcid, text in texts:
+        plan = planner.plan(text)
+        start_time = time.perf_counter()
+        summaries[pmcid] = summarize_plan(plan, summarize_many)
+        latencies.append(time.perf_counter() - start_time)
+
+    return {
+        "backend": backend,
+        "load_seconds": load_seconds,
+        "latencies": latencies,
+        "peak_rss_mb": peak_rss_mb(),
+        "rss_before_load_mb": rss_before,
+        "summaries": summaries,
+    }
+
+
+def tokens(text: str) -> list:
+    return re.findall(r"\w+", text.lower())
+
+
+def rouge_1(candidate: str, reference: str) -> float:
+    cand, ref = Counter(tokens(candidate)), Counter(tokens(reference))
+    overlap = sum((cand & ref).values())
+    if not overlap:
+        return 0.0
+    precision, recall = overlap / sum(cand.values()), overlap / sum(ref.values())
+    return 2 * precision * recall / (precision + recall)
+
+
+def rouge_l(candidate: str, reference: str) -> float:
+    cand, ref = tokens(candidate), tokens(reference)
+    if not cand or not ref:
+        return 0.0
+    # longest common subsequence, one row at a time
+    prev = [0] * (len(ref) + 1)
+    for c in cand:
+        row = [0]
+        for j, r in enumerate(ref):
+            row.append(prev[j] + 1 if c == r else max(prev[j + 1], row[j]))
+        prev = row
+    lcs = prev[-1]
+    if not lcs:
+        return 0.0
+    precision, recall = lcs / len(cand), lcs / len(ref)
+    return 2 * precision * recall / (precision + recall)
+
+
+def spawn_backend(args, backend: str) -> dict:
+    with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as out:
+        out_file = out.name
+    cmd = [sys.executable, os.path.abspath(__file__), "--worker", backend, "--out", out_file,
+           "--db", args.db, "--model", args.model, "--sample", str(args.sample), "--seed", str(args.seed),
+           "--threads", str(args.threads)]
+    try:
+        proc = subprocess.run(cmd)
+        if proc.returncode != 0:
+            print(f"[ERROR] Backend {backend} failed (exit {proc.returncode})")
+            return None
+        with open(out_file) as f:
+            return json.load(f)
+    finally:
+        os.remove(out_file)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", default="pmc_articles_csv_metadata.db")
+    parser.add_argument("--model", default=SUMMARY_MODEL)
+    parser.add_argument("--backends", nargs="+", choices=SUMMARY_BACKENDS, default=list(SUMMARY_BACKENDS))
+    parser.add_argument("--sample", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--threads", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--worker", choices=SUMMARY_BACKENDS, help=argparse.SUPPRESS)
+    parser.add_argument("--out", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        texts = sample_texts(args.db, args.sample, args.seed)
+        with open(args.out, "w") as f:
+            json.dump(run_backend(args.worker, args.model, texts, args.threads), f)
+        return
+
+    backends = ["torch"] + [b for b in args.backends if b != "torch"]
+    results = {b: r for b in backends if (r := spawn_backend(args, b)) is not None}
+    if "torch" not in results:
+        print("[ERROR] The torch baseline failed, nothing to compare against")
+        raise SystemExit(1)
+    baseline = results["torch"]["summaries"]
+
+    print(f"articles: {len(baseline)}, model: {args.model}, threads: {args.threads}")
+    print(f"{'backend':<8} {'load s':>7} {'median ms':>10} {'p95 ms':>8} {'total s':>8} {'peak RSS MB':>12} "
+          f"{'ROUGE-1':>8} {'ROUGE-L':>8}")
+    for backend, r in results.items():
+        lat = sorted(r["latencies"])
+        p95 = lat[min(len(lat) - 1, int(0.95 * len(lat)))]
+        r1 = statistics.mean(rouge_1(r["summaries"][p], baseline[p]) for p in baseline)
+        rl = statistics.mean(rouge_l(r["summaries"][p], baseline[p]) for p in baseline)
+        print(f"{backend:<8} {r['load_seconds']:7.1f} {statistics.median(lat) * 1000:10.1f} {p95 * 1000:8.1f} "
+              f"{sum(lat):8.2f} {r['peak_rss_mb']:12.0f} {r1:8.3f} {rl:8.3f}")
+
+
+if __name__ == "__main__":
+    main()
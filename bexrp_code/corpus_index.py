@@ -0,0 +1,658 @@
+#!/usr/bin/env python3
+"""In-memory indexes over the publications list, built once at startup."""
+
+import os
+import re
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from collections.abc import Mapping, Sequence
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+def normalize_str(s):
+    return s.lower().strip() if isinstance(s, str) else s
+
+
+def _split_names(value, pattern: str) -> List[str]:
+    items = re.split(pattern, value) if isinstance(value, str) else (value or [])
+    return [i.strip() for i in items if isinstance(i, str) and i.strip()]
+
+
+def _as_list(value) -> list:
+    if isinstance(value, str):
+        return [v.strip() for v in value.split(",") if v.strip()]
+    return list(value or [])
+
+
+class StringTable:
+    """Every distinct string stored once; records keep its dense int code instead."""
+
+    def __init__(self):
+        self.strings: List[str] = []
+        self.codes: Dict[str, int] = {}
+
+    def code(self, value: str) -> int:
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.strings)
+            self.strings.append(value)
+        return code
+
+    def encode(self, values: List[str]) -> List[int]:
+        return [self.code(v) for v in values]
+
+    def __getitem__(self, code: int) -> str:
+        return self.strings[code]
+
+    def __len__(self) -> int:
+        return len(self.strings)
+
+
+class Publication(Mapping):
+    """
+    One article of a PublicationStore, read like the publication dicts it replaces
+    (pub['Title'], pub.get('Authors'), ...). Only the scalar strings live on the record;
+    authors, keywords, publisher, date and flags are read from the store's columns and
+    Abstract / Sections / Images are loaded from SQLite on access.
+    """
+
+    __slots__ = ("store", "id", "pmcid", "title", "image", "pdf")
+
+    FIELDS = ('id', 'Title', 'Link', 'Authors', 'Publisher', 'Pmcid', 'Keywords', 'Abstract', 'Sections',
+              'PublicationDate', 'Restricted', 'Images', 'Image', 'Pdf', 'Default_Img_Found')
+
+    def __init__(self, store: "PublicationStore", pub_id: int, pmcid: str, title: str, image: str, pdf: Optional[str]):
+        self.store = store
+        self.id = pub_id
+        self.pmcid = pmcid
+        self.title = title
+        self.image = image
+        self.pdf = pdf
+
+    def __getitem__(self, key):
+        getter = _PUBLICATION_GETTERS.get(key)
+        if getter is None:
+            raise KeyError(key)
+        return getter(self)
+
+    def __iter__(self):
+        return iter(self.FIELDS)
+
+    def __len__(self) -> int:
+        return len(self.FIELDS)
+
+    def __contains__(self, key) -> bool:
+        # without this, Mapping would load the article text to answer `'Abstract' in pub`
+        return key in _PUBLICATION_GETTERS
+
+    __hash__ = object.__hash__
+
+    def __repr__(self) -> str:
+        return f"Publication(id={self.id}, pmcid={self.pmcid!r}, title={self.title[:60]!r})"
+
+    def to_dict(self, fields=None) -> dict:
+        """plain dict of `fields` (all of them by default), e.g. for jsonify"""
+        return {f: self[f] for f in (fields or self.FIELDS) if f in _PUBLICATION_GETTERS}
+
+
+_PUBLICATION_GETTERS = {
+    'id': lambda p: p.id,
+    'Title': lambda p: p.title,
+    'Link': lambda p: f"https://www.ncbi.nlm.nih.gov/pmc/articles/{p.pmcid or ''}/",
+    'Authors': lambda p: p.store.authors_of(p.id),
+    'Publisher': lambda p: p.store.publisher_of(p.id),
+    'Pmcid': lambda p: p.pmcid,
+    'Keywords': lambda p: p.store.keywords_of(p.id),
+    'Abstract': lambda p: p.store.text(p.pmcid)['abstract'] or p.store.no_abstract,
+    'Sections': lambda p: p.store.text(p.pmcid)['sections'],
+    'PublicationDate': lambda p: p.store.date_of(p.id),
+    'Restricted': lambda p: bool(p.store.restricted[p.id]),
+    'Images': lambda p: p.store.text(p.pmcid)['images'],
+    'Image': lambda p: p.image,
+    'Pdf': lambda p: p.pdf,
+    'Default_Img_Found': lambda p: not p.store.has_images[p.id],
+}
+
+
+class PublicationStore(Sequence):
+    """
+    The publications in compact form, indexed by publication id. Author, keyword and
+    publisher strings are interned in StringTables and stored as int32 codes (authors and
+    keywords CSR style: codes[ptr[i]:ptr[i + 1]]), dates and flags are columnar arrays and
+    the rest sits in one __slots__ Publication per article. Large text is not kept: it is
+    read through `text_loader(pmcid)` into a small LRU cache when a route asks for it.
+    """
+
+    TEXT_CACHE_SIZE = 256
+
+    def __init__(self, catalog: List[dict], text_loader: Callable[[str], Optional[dict]], default_image: str,
+                 no_abstract: str):
+        self.text_loader = text_loader
+        self.no_abstract = no_abstract
+        self.authors = StringTable()
+        self.keywords = StringTable()
+        self.publishers = StringTable()
+
+        author_codes, keyword_codes, author_ptr, keyword_ptr = [], [], [0], [0]
+        publisher_codes, dates = [], []
+        self.records: List[Publication] = []
+        for pub_id, article in enumerate(catalog):
+            author_codes += self.authors.encode(_as_list(article.get('authors')))
+            author_ptr.append(len(author_codes))
+            keyword_codes += self.keywords.encode(_as_list(article.get('keywords')))
+            keyword_ptr.append(len(keyword_codes))
+            publisher = article.get('publisher')
+            publisher_codes.append(self.publishers.code(publisher) if publisher is not None else -1)
+            dates.append((article.get('publication_date') or "").encode())
+            self.records.append(Publication(
+                self, pub_id, article.get('pmcid'), (article.get('title') or '').replace("▿", "") or 'Untitled',
+                article.get('image') or default_image, article.get('Pdf_URL')))
+
+        self.author_codes = np.asarray(author_codes, dtype=np.int32)
+        self.author_ptr = np.asarray(author_ptr, dtype=np.int32)
+        self.keyword_codes = np.asarray(keyword_codes, dtype=np.int32)
+        self.keyword_ptr = np.asarray(keyword_ptr, dtype=np.int32)
+        self.publisher_codes = np.asarray(publisher_codes, dtype=np.int32)
+        self.dates = np.asarray(dates, dtype=bytes) if dates else np.zeros(0, dtype="S1")
+        self.years = np.asarray([int(d[:4]) if d[:4].isdigit() else 0 for d in dates], dtype=np.int16)
+        self.restricted = np.asarray([bool(a.get('restricted')) for a in catalog], dtype=bool)
+        self.has_images = np.asarray([bool(a.get('image')) for a in catalog], dtype=bool)
+
+        self._texts: "OrderedDict[str, dict]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __getitem__(self, pub_id):
+        return self.records[pub_id]
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def __iter__(self):
+        return iter(self.records)
+
+    def authors_of(self, pub_id: int) -> List[str]:
+        strings = self.authors.strings
+        return [strings[c] for c in self.author_codes[self.author_ptr[pub_id]:self.author_ptr[pub_id + 1]]]
+
+    def keywords_of(self, pub_id: int) -> List[str]:
+        strings = self.keywords.strings
+        return [strings[c] for c in self.keyword_codes[self.keyword_ptr[pub_id]:self.keyword_ptr[pub_id + 1]]]
+
+    def publisher_of(self, pub_id: int) -> Optional[str]:
+        code = self.publisher_codes[pub_id]
+        return self.publishers[code] if code >= 0 else None
+
+    def date_of(self, pub_id: int) -> Optional[str]:
+        return self.dates[pub_id].decode() or None
+
+    def text(self, pmcid: str) -> dict:
+        """{"abstract", "sections", "images"} of one article, from the LRU cache or the loader"""
+        with self._lock:
+            text = self._texts.get(pmcid)
+            if text is not None:
+                self._texts.move_to_end(pmcid)
+                return text
+        text = self.text_loader(pmcid) if pmcid else None
+        text = text or {"abstract": None, "sections": {}, "images": []}
+        with self._lock:
+            self._texts[pmcid] = text
+            if len(self._texts) > self.TEXT_CACHE_SIZE:
+                self._texts.popitem(last=False)
+        return text
+
+    def sorted_authors(self) -> List[str]:
+        return sorted(self.authors.strings)
+
+    def sorted_keywords(self) -> List[str]:
+        return sorted(self.keywords.strings)
+
+    def sorted_publishers(self) -> List[str]:
+        """publisher names, with comma separated publisher strings split into their parts"""
+        return sorted({p for value in self.publishers.strings for p in _split_names(value, r',')})
+
+    def sorted_years(self) -> List[int]:
+        return sorted(int(y) for y in np.unique(self.years) if y)
+
+
+class PublicationLookup:
+    """
+    Constant-time lookups over the publications list: by id, pmcid and normalized title.
+    """
+
+    def __init__(self, publications: List[dict]):
+        self.by_id: Dict[int, dict] = {}
+        self.by_pmcid: Dict[str, dict] = {}
+        self.by_title: Dict[str, dict] = {}
+        for pub in publications:
+            self.by_id[pub['id']] = pub
+            if pub.get('Pmcid'):
+                self.by_pmcid.setdefault(pub['Pmcid'], pub)
+            # first publication wins, like the scans this replaces
+            self.by_title.setdefault(normalize_str(pub.get('Title') or ""), pub)
+
+
+class Facet:
+    """
+    One filter group as an inverted index: value -> sorted int32 array of publication ids.
+    The postings are also kept flattened (post_ids / post_vals) so counts for every value
+    over a result set are a single bincount.
+    """
+
+    def __init__(self, name: str, values_per_pub: List[List[tuple]], missing: List[int]):
+        self.name = name
+        self.keys: Dict[str, int] = {}
+        self.labels: List[str] = []
+        postings: List[List[int]] = []
+        for pub_id, values in enumerate(values_per_pub):
+            for key, label in values:
+                idx = self.keys.get(key)
+                if idx is None:
+                    idx = self.keys[key] = len(self.labels)
+                    self.labels.append(label)
+                    postings.append([])
+                if not postings[idx] or postings[idx][-1] != pub_id:
+                    postings[idx].append(pub_id)
+        self.postings = [np.asarray(p, dtype=np.int32) for p in postings]
+        self.post_ids = np.concatenate(self.postings) if postings else np.zeros(0, dtype=np.int32)
+        self.post_vals = np.repeat(np.arange(len(postings), dtype=np.int32), [len(p) for p in postings])
+        self.missing = np.asarray(missing, dtype=np.int32)
+
+    def ids(self, key: str) -> np.ndarray:
+        idx = self.keys.get(key)
+        return self.postings[idx] if idx is not None else np.zeros(0, dtype=np.int32)
+
+    def keys_containing(self, fragment: str) -> List[str]:
+        return [key for key in self.keys if fragment in key]
+
+    def counts(self, mask: np.ndarray, limit: Optional[int] = None) -> List[dict]:
+        counts = np.bincount(self.post_vals[mask[self.post_ids]], minlength=len(self.labels))
+        nonzero = np.flatnonzero(counts)
+        order = nonzero[np.argsort(-counts[nonzero], kind="stable")]
+        if limit is not None:
+            order = order[:limit]
+        return [{"value": self.labels[i], "count": int(counts[i])} for i in order]
+
+
+class FacetIndex:
+    """
+    Facet indexes for /api/advancedf. Filters resolve to boolean masks over publication ids:
+    values inside a group are OR-ed, groups are AND-ed, matching the old per-request scans.
+    """
+
+    GROUPS = ("Keywords", "Authors", "Publication Year", "Publisher")
+
+    def __init__(self, publications: List[dict]):
+        self.size = len(publications)
+        keywords, authors, years, publishers = [], [], [], []
+        no_keywords, no_authors, no_year, no_publisher = [], [], [], []
+        for pub in publications:
+            pub_id = pub['id']
+            kws = [k for k in pub.get('Keywords') or [] if isinstance(k, str)]
+            keywords.append([(normalize_str(k), k) for k in kws])
+            if not pub.get('Keywords'):
+                no_keywords.append(pub_id)
+
+            auths = [a for a in pub.get('Authors') or [] if isinstance(a, str)]
+            authors.append([(normalize_str(a), a) for a in auths])
+            if not pub.get('Authors'):
+                no_authors.append(pub_id)
+
+            date = pub.get('PublicationDate')
+            years.append([(date[:4], date[:4])] if date and date[:4].isdigit() else [])
+            if not date:
+                no_year.append(pub_id)
+
+            publisher = pub.get('Publisher')
+            publishers.append([(normalize_str(publisher), publisher)] if isinstance(publisher, str) and publisher else [])
+            if not publisher:
+                no_publisher.append(pub_id)
+
+        self.facets = {
+            "Keywords": Facet("Keywords", keywords, no_keywords),
+            "Authors": Facet("Authors", authors, no_authors),
+            "Publication Year": Facet("Publication Year", years, no_year),
+            "Publisher": Facet("Publisher", publishers, no_publisher),
+        }
+
+        # dense rank of PublicationDate ('' when missing) for the newest/oldest sorts
+        dates = [pub.get('PublicationDate') or "" for pub in publications]
+        distinct = {d: rank for rank, d in enumerate(sorted(set(dates)))}
+        self.date_rank = np.asarray([distinct[d] for d in dates], dtype=np.int32)
+        self.order = {
+            "oldest": np.argsort(self.date_rank, kind="stable").astype(np.int32),
+            "newest": np.argsort(-self.date_rank, kind="stable").astype(np.int32),
+        }
+
+    def _group_ids(self, group_name: str, selected: list) -> Optional[np.ndarray]:
+        facet = self.facets.get(group_name)
+        if facet is None:
+            return None
+        selected_norm = [normalize_str(s) for s in selected]
+        parts = []
+        if group_name == "Keywords":
+            parts = [facet.ids(s) for s in selected_norm]
+            if any("no keyword" in s for s in selected_norm):
+                parts.append(facet.missing)
+        elif group_name == "Authors":
+            parts = [facet.ids(s) for s in selected_norm]
+            if "no author" in selected_norm:
+                parts.append(facet.missing)
+        elif group_name == "Publication Year":
+            for s in selected:
+                try:
+                    parts.append(facet.ids(f"{int(s):04d}"))
+                except ValueError:
+                    continue
+            if "no year" in selected_norm:
+                parts.append(facet.missing)
+        elif group_name == "Publisher":
+            # publisher filters are substring matches against the whole publisher name
+            for s in selected_norm:
+                parts.extend(facet.ids(key) for key in facet.keys_containing(s))
+            if "no publisher" in selected_norm:
+                parts.append(facet.missing)
+        return np.concatenate(parts) if parts else np.zeros(0, dtype=np.int32)
+
+    def filter_mask(self, filters: dict) -> np.ndarray:
+        mask = np.ones(self.size, dtype=bool)
+        for group_name, selected in (filters or {}).items():
+            if not selected:
+                continue
+            ids = self._group_ids(group_name, selected)
+            if ids is None:
+                continue
+            group_mask = np.zeros(self.size, dtype=bool)
+            group_mask[ids] = True
+            mask &= group_mask
+        return mask
+
+    def select(self, mask: np.ndarray, sort: Optional[str] = None, ranked_ids: Optional[List[int]] = None) -> np.ndarray:
+        """
+        Ids passing `mask`, in `ranked_ids` order when given (search relevance) or id order,
+        then stably re-sorted by date for sort='newest'/'oldest'.
+        """
+        if ranked_ids is None:
+            if sort in self.order:
+                ordered = self.order[sort]
+                return ordered[mask[ordered]]
+            return np.flatnonzero(mask).astype(np.int32)
+        ids = np.asarray(ranked_ids, dtype=np.int32)
+        ids = ids[mask[ids]]
+        if sort == "newest":
+            ids = ids[np.argsort(-self.date_rank[ids], kind="stable")]
+        elif sort == "oldest":
+            ids = ids[np.argsort(self.date_rank[ids], kind="stable")]
+        return ids
+
+    def counts(self, ids: np.ndarray, limit: Optional[int] = None) -> dict:
+        mask = np.zeros(self.size, dtype=bool)
+        mask[ids] = True
+        return {name: facet.counts(mask, limit) for name, facet in self.facets.items()}
+
+
+def author_node_id(name: str) -> str:
+    return "author_" + re.sub(r'\W+', '_', name.lower()).strip('_')
+
+
+def keyword_node_id(keyword: str) -> str:
+    return "keyword_" + keyword.lower()
+
+
+class KnowledgeGraph:
+    """
+    Article / author / keyword graph built once from the publications list, stored as CSR
+    adjacency over integer nodes. Article nodes are 0..n-1 (the publication ids); node keys
+    are the vis.js ids the UI already uses ('article_<id>', 'author_<name>', 'keyword_<kw>').
+    Neighbors keep publication order: an article's authors/keywords in listed order, an
+    author's/keyword's articles by id.
+    """
+
+    ARTICLE, AUTHOR, KEYWORD = 0, 1, 2
+    GROUPS = ("article", "author", "keyword")
+
+    def __init__(self, publications: List[dict]):
+        self.keys: List[str] = []
+        self.labels: List[str] = []
+        self.index: Dict[str, int] = {}
+        groups: List[int] = []
+
+        def node(key: str, label: str, group: int) -> int:
+            idx = self.index.get(key)
+            if idx is None:
+                idx = self.index[key] = len(self.keys)
+                self.keys.append(key)
+                self.labels.append(label)
+                groups.append(group)
+            return idx
+
+        for pub in publications:
+            node(f"article_{pub['id']}", pub.get('Title'), self.ARTICLE)
+
+        src: List[int] = []
+        dst: List[int] = []
+        spellings: List[str] = []
+        for pub in publications:
+            linked = {}
+            for name in _split_names(pub.get('Authors'), r'[,;]+'):
+                linked.setdefault(node(author_node_id(name), name, self.AUTHOR), name)
+            for keyword in _split_names(pub.get('Keywords'), r','):
+                linked.setdefault(node(keyword_node_id(keyword), keyword, self.KEYWORD), keyword)
+            for other, spelling in linked.items():
+                src += (pub['id'], other)
+                dst += (other, pub['id'])
+                spellings += (spelling, spelling)
+
+        self.groups = np.asarray(groups, dtype=np.int8)
+        src_arr = np.asarray(src, dtype=np.int32)
+        order = np.argsort(src_arr, kind="stable")
+        self.indices = np.asarray(dst, dtype=np.int32)[order]
+        # how each author/keyword is written in the article an edge belongs to
+        self.spellings = [spellings[i] for i in order.tolist()]
+        self.indptr = np.zeros(len(self.keys) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(src_arr, minlength=len(self.keys)), out=self.indptr[1:])
+
+        # degree until graph_analytics.py results are attached
+        self.degree = np.diff(self.indptr)
+        self.centrality = self.degree.astype(np.float64)
+        self.community = np.full(len(self.keys), -1, dtype=np.int32)
+        self.related: Dict[int, List[tuple]] = {}
+
+    def attach_analytics(self, node_stats: dict, related: dict, article_ids: Dict[str, int]):
+        """
+        Load PMCDatabase.fetch_graph_analytics() results. Articles are stored by pmcid, so
+        `article_ids` maps pmcid -> article node. Nodes added since the last run keep
+        centrality 0 and community -1.
+        """
+        if not node_stats:
+            return
+        self.centrality = np.zeros(len(self.keys))
+        for key, (group, _, pagerank, community) in node_stats.items():
+            node = article_ids.get(key) if group == "article" else self.index.get(key)
+            if node is not None:
+                self.centrality[node] = pagerank
+                self.community[node] = community
+        self.related = {
+            article_ids[pmcid]: [(article_ids[other], score) for other, score in items if other in article_ids]
+            for pmcid, items in related.items() if pmcid in article_ids
+        }
+
+    def node(self, key: str) -> Optional[int]:
+        return self.index.get(key)
+
+    def neighbors(self, node: int, group: Optional[int] = None) -> np.ndarray:
+        nbrs = self.indices[self.indptr[node]:self.indptr[node + 1]]
+        return nbrs if group is None else nbrs[self.groups[nbrs] == group]
+
+    def top_central(self, limit: int, group: Optional[int] = None, community: Optional[int] = None) -> np.ndarray:
+        candidates = np.arange(len(self.keys))
+        if group is not None:
+            candidates = candidates[self.groups[candidates] == group]
+        if community is not None:
+            candidates = candidates[self.community[candidates] == community]
+        return candidates[np.argsort(-self.centrality[candidates], kind="stable")[:limit]]
+
+    def top_neighbors(self, node: int, limit: int) -> np.ndarray:
+        nbrs = self.neighbors(node)
+        return nbrs[np.argsort(-self.centrality[nbrs], kind="stable")[:limit]]
+
+    def induced_edges(self, members) -> List[tuple]:
+        """Edges between `members`, each once, as (author/keyword, article) pairs."""
+        members = set(int(m) for m in members)
+        edges = []
+        for node in sorted(members):
+            if self.groups[node] == self.ARTICLE:
+                continue
+            edges.extend((node, int(a)) for a in self.neighbors(node, self.ARTICLE) if int(a) in members)
+        return edges
+
+    def linked(self, article: int, group: int) -> List[tuple]:
+        """(node, spelling in this article) for the authors or keywords of an article."""
+        start, end = self.indptr[article], self.indptr[article + 1]
+        return [(int(self.indices[i]), self.spellings[i]) for i in range(start, end) if self.groups[self.indices[i]] == group]
+
+    def k_hop(self, node: int, hops: int, max_fanout: int, max_nodes: int):
+        """
+        Breadth-first expansion up to `hops` steps, following at most `max_fanout` neighbors
+        per node and stopping at `max_nodes` nodes. Returns (nodes in BFS order, edges).
+        """
+        seen = {node}
+        order, edges = [node], []
+        frontier = [node]
+        for _ in range(hops):
+            next_frontier = []
+            for current in frontier:
+                for nbr in self.neighbors(current)[:max_fanout].tolist():
+                    if nbr in seen:
+                        continue
+                    if len(order) >= max_nodes:
+                        return order, edges
+                    seen.add(nbr)
+                    order.append(nbr)
+                    edges.append((current, nbr))
+                    next_frontier.append(nbr)
+            frontier = next_frontier
+        return order, edges
+
+    def co_occurring(self, node: int, limit: int) -> List[tuple]:
+        """
+        (node, shared article count) for nodes of the same kind that share articles with `node`:
+        co-authors of an author, co-occurring keywords of a keyword. Most shared first.
+        """
+        articles = self.neighbors(node, self.ARTICLE)
+        if not len(articles):
+            return []
+        group = self.groups[node]
+        others = np.concatenate([self.neighbors(a, group) for a in articles.tolist()])
+        others = others[others != node]
+        if not len(others):
+            return []
+        ids, counts = np.unique(others, return_counts=True)
+        top = np.argsort(-counts, kind="stable")[:limit]
+        return [(int(ids[i]), int(counts[i])) for i in top]
+
+
+class EmbeddingIndex:
+    """
+    Normalized sentence embeddings of every article (title + abstract + sections), one row
+    per pmcid, stored next to the DB as <db>.embeddings.npy (memory-mapped when loaded) and
+    <db>.embeddings.json (row order, model, per-row text hashes). Cosine similarity is a
+    dot product, scored in chunks so float16 rows never need a full float32 copy.
+    """
+
+    CHUNK_ROWS = 65536
+
+    def __init__(self, vectors: np.ndarray, pmcids: List[str], hashes: List[str], model: str):
+        self.vectors = vectors
+        self.pmcids = pmcids
+        self.hashes = hashes
+        self.model = model
+
+    @staticmethod
+    def paths(db_file: str) -> Tuple[str, str]:
+        base = os.path.splitext(db_file)[0]
+        return base + ".embeddings.npy", base + ".embeddings.json"
+
+    @staticmethod
+    def article_text(record: dict) -> str:
+        sections = record.get('sections') or {}
+        parts = [record.get('title') or "", record.get('abstract') or ""]
+        parts += [t for t in sections.values() if isinstance(t, str)] if isinstance(sections, dict) else []
+        return "\n".join(p for p in parts if p)
+
+    @classmethod
+    def load(cls, db_file: str) -> Optional["EmbeddingIndex"]:
+        npy_path, meta_path = cls.paths(db_file)
+        if not (os.path.exists(npy_path) and os.path.exists(meta_path)):
+            return None
+        with open(meta_path) as f:
+            meta = json.load(f)
+        return cls(np.load(npy_path, mmap_mode="r"), meta["pmcids"], meta["hashes"], meta["model"])
+
+    @classmethod
+    def build(cls, db_file: str, records: List[dict], encode: Callable[[List[str]], np.ndarray], model: str,
+              dtype=np.float16) -> Optional["EmbeddingIndex"]:
+        """
+        Embed `records` with `encode` (texts -> normalized float rows) and save the index.
+        Rows whose text and model are unchanged are copied from the previous index.
+        Returns None without writing anything when there is nothing to embed and no previous index.
+        """
+        previous = cls.load(db_file)
+        reuse = {}
+        if previous is not None and previous.model == model:
+            reuse = {(pmcid, h): row for row, (pmcid, h) in enumerate(zip(previous.pmcids, previous.hashes))}
+
+        pmcids, hashes, texts = [], [], []
+        for record in records:
+            text = cls.article_text(record)
+            pmcids.append(record['pmcid'])
+            hashes.append(hashlib.sha256(text.encode("utf-8")).hexdigest())
+            texts.append(text)
+
+        todo = [i for i, key in enumerate(zip(pmcids, hashes)) if key not in reuse]
+        if not todo and previous is None:
+            # no rows to take the vector width from
+            print("[DEBUG] Embeddings: no articles to embed, index not written")
+            return None
+        encoded = np.asarray(encode([texts[i] for i in todo]), dtype=np.float32) if todo else None
+        dim = encoded.shape[1] if encoded is not None else previous.vectors.shape[1]
+        vectors = np.zeros((len(pmcids), dim), dtype=dtype)
+        for i, key in enumerate(zip(pmcids, hashes)):
+            if key in reuse:
+                vectors[i] = previous.vectors[reuse[key]]
+        if todo:
+            vectors[todo] = encoded
+        print(f"[DEBUG] Embeddings: {len(todo)} encoded, {len(pmcids) - len(todo)} reused")
+
+        # write to temp files and swap, so a running app never maps a half-written matrix
+        npy_path, meta_path = cls.paths(db_file)
+        with open(npy_path + ".tmp", "wb") as f:
+            np.save(f, vectors)
+        with open(meta_path + ".tmp", "w") as f:
+            json.dump({"model": model, "pmcids": pmcids, "hashes": hashes}, f)
+        os.replace(npy_path + ".tmp", npy_path)
+        os.replace(meta_path + ".tmp", meta_path)
+        return cls.load(db_file)
+
+    def scores(self, query: np.ndarray) -> np.ndarray:
+        query = np.asarray(query, dtype=np.float32)
+        out = np.empty(len(self.pmcids), dtype=np.float32)
+        for start in range(0, len(self.pmcids), self.CHUNK_ROWS):
+            chunk = np.asarray(self.vectors[start:start + self.CHUNK_ROWS], dtype=np.float32)
+            out[start:start + len(chunk)] = chunk @ query
+        return out
+
+    def top_k(self, query: np.ndarray, k: int, row_mask: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Best `k` rows (optionally only where row_mask is True) and their cosine scores, best first."""
+        scores = self.scores(query)
+        if row_mask is not None:
+            scores[~row_mask] = -np.inf
+        k = min(k, int(np.isfinite(scores).sum()))
+        if k <= 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        rows = np.argpartition(-scores, k - 1)[:k]
+        rows = rows[np.argsort(-scores[rows], kind="stable")]
+        return rows, scores[rows]
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Offline knowledge-graph analytics over the graph /api/kg serves: degree and PageRank
+centrality, Louvain communities and top-k related articles per article, stored in the
+kg_nodes / related_articles tables of the articles DB. Re-run after ingesting articles.
+
+    python graph_analytics.py --related 10
+"""
+
+import time
+import argparse
+from typing import List
+
+import numpy as np
+
+from corpus_index import KnowledgeGraph
+from pmc_toolkit import PMCDatabase
+
+RELATED_ARTICLES = 10
+PAGERANK_DAMPING = 0.85
+
+
+def graph_publications(records: List[dict]) -> List[dict]:
+    """The fields KnowledgeGraph reads, shaped like app.py's publications."""
+    return [{
+        'id': i,
+        'Title': r.get('title'),
+        'Pmcid': r.get('pmcid'),
+        'Authors': r.get('authors'),
+        'Keywords': r.get('keywords'),
+    } for i, r in enumerate(records)]
+
+
+def csr_sources(kg: KnowledgeGraph) -> np.ndarray:
+    return np.repeat(np.arange(len(kg.keys), dtype=np.int32), np.diff(kg.indptr))
+
+
+def pagerank(kg: KnowledgeGraph, damping: float = PAGERANK_DAMPING, max_iter: int = 100, tol: float = 1e-10) -> np.ndarray:
+    n = len(kg.keys)
+    degree = np.diff(kg.indptr)
+    sources = csr_sources(kg)
+    dangling = degree == 0
+    rank = np.full(n, 1.0 / n)
+    for _ in range(max_iter):
+        share = np.where(dangling, 0.0, rank / np.maximum(degree, 1))
+        new = np.bincount(kg.indices, weights=share[sources], minlength=n)
+        new = damping * (new + rank[dangling].sum() / n) + (1.0 - damping) / n
+        converged = np.abs(new - rank).sum() < tol
+        rank = new
+        if converged:
+            break
+    return rank
+
+
+def communities(kg: KnowledgeGraph, seed: int = 0) -> np.ndarray:
+    """Louvain communities, numbered from the largest."""
+    import networkx as nx
+    graph = nx.Graph()
+    graph.add_nodes_from(range(len(kg.keys)))
+    graph.add_edges_from(zip(csr_sources(kg).tolist(), kg.indices.tolist()))
+    found = sorted(nx.community.louvain_communities(graph, seed=seed), key=len, reverse=True)
+    labels = np.full(len(kg.keys), -1, dtype=np.int32)
+    for community, members in enumerate(found):
+        labels[list(members)] = community
+    return labels
+
+
+def related_articles(kg: KnowledgeGraph, n_articles: int, k: int) -> List[List[tuple]]:
+    """
+    Per article, the k articles sharing the most authors/keywords, each shared node weighted
+    by 1 / log(1 + degree) so rare links (a small lab, a niche keyword) count for more.
+    """
+    degree = np.diff(kg.indptr)
+    weights = 1.0 / np.log1p(np.maximum(degree, 1))
+    related = []
+    for article in range(n_articles):
+        scores = np.zeros(n_articles)
+        for other in kg.neighbors(article).tolist():
+            scores[kg.neighbors(other, kg.ARTICLE)] += weights[other]
+        scores[article] = 0.0
+        candidates = np.flatnonzero(scores > 0)
+        if 0 < k < len(candidates):
+            # partial selection of the k best, keeping ties with the k-th so the order stays stable
+            best = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+            candidates = candidates[scores[candidates] >= scores[best].min()]
+        top = candidates[np.argsort(-scores[candidates], kind="stable")][:k]
+        related.append([(int(i), float(scores[i])) for i in top])
+    return related
+
+
+class GraphAnalytics:
+    def __init__(self, db_file: str, related: int = RELATED_ARTICLES):
+        self.db = PMCDatabase(db_file)
+        self.related = related
+
+    def run(self) -> dict:
+        start_time = time.time()
+        pubs = graph_publications(self.db.fetch_filtered())
+        kg = KnowledgeGraph(pubs)
+        print(f"[DEBUG] Graph: {len(kg.keys)} nodes, {len(kg.indices) // 2} edges")
+
+        ranks = pagerank(kg)
+        labels = communities(kg)
+        related = related_articles(kg, len(pubs), self.related)
+        degree = np.diff(kg.indptr)
+
+        node_rows = []
+        for node, key in enumerate(kg.keys):
+            group = kg.GROUPS[kg.groups[node]]
+            node_key = pubs[node]['Pmcid'] if group == "article" else key
+            node_rows.append((node_key, group, int(degree[node]), float(ranks[node]), int(labels[node])))
+        related_rows = [(pubs[article]['Pmcid'], rank, pubs[other]['Pmcid'], score)
+                        for article, items in enumerate(related)
+                        for rank, (other, score) in enumerate(items)]
+        self.db.store_graph_analytics(node_rows, related_rows)
+
+        elapsed = time.time() - start_time
+        stats = {
+            "nodes": len(node_rows),
+            "communities": int(labels.max()) + 1 if len(labels) else 0,
+            "related_pairs": len(related_rows),
+            "elapsed": elapsed,
+        }
+        print(f"[DEBUG] Stored analytics for {stats['nodes']} nodes, {stats['communities']} communities, "
+              f"{stats['related_pairs']} related pairs in {elapsed:.2f} sec")
+        return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Precompute knowledge-graph centrality, communities and related articles.")
+    parser.add_argument("--db", default="pmc_articles_csv_metadata.db")
+    parser.add_argument("--related", type=int, default=RELATED_ARTICLES, help="related articles kept per article")
+    args = parser.parse_args()
+
+    GraphAnalytics(args.db, related=args.related).run()
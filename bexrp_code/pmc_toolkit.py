@@ -1,22 +1,36 @@
 #!/usr/bin/env python3
 
+import io
 import os
 import re
 import time
 import json
+import hashlib
 import random
 import sqlite3
-from typing import List, Optional
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Iterator, List, Optional, Tuple
 
 import requests
 import pandas as pd
 import xml.etree.ElementTree as ET
-from bs4 import BeautifulSoup
+from html import unescape
 from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
 from urllib3.util.retry import Retry
 
 
-def make_session(total_retries: int = 3, backoff_factor: float = 0.5) -> requests.Session:
+# NCBI allows 3 requests/sec per client without an API key (10/sec with one)
+NCBI_REQUESTS_PER_SECOND = 3.0
+EFETCH_URL = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/efetch.fcgi"
+# ids per efetch call; NCBI recommends POST above ~200 ids, so stay below that for GET
+EFETCH_BATCH_SIZE = 100
+HTTP_CACHE_MAX_BYTES = 512 * 1024 * 1024
+SENTENCE_MODEL_NAME = "all-MiniLM-L6-v2"
+
+
+def make_session(total_retries: int = 3, backoff_factor: float = 0.5, pool_size: int = 10) -> requests.Session:
     session = requests.Session()
     retries = Retry(
         total=total_retries,
@@ -24,12 +38,250 @@ def make_session(total_retries: int = 3, backoff_factor: float = 0.5) -> request
         status_forcelist=(429, 500, 502, 503, 504),
         allowed_methods=frozenset(["GET", "POST", "HEAD"])
     )
-    adapter = HTTPAdapter(max_retries=retries)
+    adapter = HTTPAdapter(max_retries=retries, pool_connections=pool_size, pool_maxsize=pool_size)
     session.mount("https://", adapter)
     session.mount("http://", adapter)
     return session
 
 
+class RateLimiter:
+    """Thread-safe limiter that spaces calls to at most `requests_per_second` globally."""
+
+    def __init__(self, requests_per_second: float = NCBI_REQUESTS_PER_SECOND):
+        self.interval = 1.0 / requests_per_second if requests_per_second and requests_per_second > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
+
+
+class CacheMiss(Exception):
+    pass
+
+
+class ResponseCache:
+    """
+    On-disk cache of raw HTTP responses (efetch XML, article HTML).
+
+    Bodies are stored zstd-compressed and content-addressed under blobs/<sha256>.zst, and an
+    index.db maps each URL to its blob plus the ETag/Last-Modified validators. Entries are
+    evicted least-recently-used once the compressed size exceeds `max_bytes`.
+    With `offline`, lookups never touch the network and a missing entry raises CacheMiss.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int = HTTP_CACHE_MAX_BYTES, offline: bool = False,
+                 compression_level: int = 10):
+        import pyzstd
+        self._zstd = pyzstd
+        self.cache_dir = cache_dir
+        self.blob_dir = os.path.join(cache_dir, "blobs")
+        self.index_file = os.path.join(cache_dir, "index.db")
+        self.max_bytes = max_bytes
+        self.offline = offline
+        self.compression_level = compression_level
+        self._lock = threading.Lock()
+        os.makedirs(self.blob_dir, exist_ok=True)
+        conn = sqlite3.connect(self.index_file)
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS entries (
+            url TEXT PRIMARY KEY,
+            blob TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            content_type TEXT,
+            encoding TEXT,
+            etag TEXT,
+            last_modified TEXT,
+            stored_at REAL,
+            last_access REAL
+        )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_last_access ON entries(last_access)")
+        # url -> url whose cached body also contains it (single-id efetch -> batch efetch)
+        conn.execute("CREATE TABLE IF NOT EXISTS aliases (url TEXT PRIMARY KEY, target TEXT NOT NULL)")
+        conn.commit()
+        conn.close()
+
+    def _blob_path(self, blob: str) -> str:
+        return os.path.join(self.blob_dir, blob[:2], f"{blob}.zst")
+
+    def _lookup(self, url: str) -> Optional[dict]:
+        conn = sqlite3.connect(self.index_file)
+        row = conn.execute(
+            "SELECT blob, content_type, encoding, etag, last_modified FROM entries WHERE url = ?", (url,)
+        ).fetchone()
+        conn.close()
+        if row is None:
+            return None
+        blob, content_type, encoding, etag, last_modified = row
+        return {"blob": blob, "content_type": content_type, "encoding": encoding,
+                "etag": etag, "last_modified": last_modified}
+
+    def alias(self, url: str, target: str):
+        with self._lock:
+            conn = sqlite3.connect(self.index_file)
+            conn.execute("INSERT OR REPLACE INTO aliases (url, target) VALUES (?, ?)", (url, target))
+            conn.commit()
+            conn.close()
+
+    def resolve(self, url: str) -> str:
+        """Return `url` if it has its own entry, else the URL it is aliased to (or `url` itself)."""
+        conn = sqlite3.connect(self.index_file)
+        own = conn.execute("SELECT 1 FROM entries WHERE url = ?", (url,)).fetchone()
+        row = None if own else conn.execute("SELECT target FROM aliases WHERE url = ?", (url,)).fetchone()
+        conn.close()
+        return row[0] if row else url
+
+    def read(self, url: str) -> Optional[requests.Response]:
+        entry = self._lookup(url)
+        if entry is None:
+            return None
+        try:
+            with open(self._blob_path(entry["blob"]), "rb") as f:
+                content = self._zstd.decompress(f.read())
+        except OSError:
+            return None
+        with self._lock:
+            conn = sqlite3.connect(self.index_file)
+            conn.execute("UPDATE entries SET last_access = ? WHERE url = ?", (time.time(), url))
+            conn.commit()
+            conn.close()
+        resp = requests.Response()
+        resp.status_code = 200
+        resp.url = url
+        resp._content = content
+        resp.encoding = entry["encoding"]
+        resp.headers = CaseInsensitiveDict({"Content-Type": entry["content_type"] or ""})
+        return resp
+
+    def validators(self, url: str) -> dict:
+        entry = self._lookup(url)
+        headers = {}
+        if entry is not None:
+            if entry["etag"]:
+                headers["If-None-Match"] = entry["etag"]
+            if entry["last_modified"]:
+                headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def store(self, url: str, content: bytes, content_type: Optional[str] = None, encoding: Optional[str] = None,
+              etag: Optional[str] = None, last_modified: Optional[str] = None):
+        blob = hashlib.sha256(content).hexdigest()
+        path = self._blob_path(blob)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(self._zstd.compress(content, self.compression_level))
+            os.replace(tmp_path, path)
+        size = os.path.getsize(path)
+        now = time.time()
+        with self._lock:
+            conn = sqlite3.connect(self.index_file)
+            conn.execute("""
+            INSERT OR REPLACE INTO entries (url, blob, size, content_type, encoding, etag, last_modified, stored_at, last_access)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (url, blob, size, content_type, encoding, etag, last_modified, now, now))
+            conn.commit()
+            conn.close()
+        self.evict()
+
+    def store_response(self, url: str, resp: requests.Response):
+        self.store(url, resp.content, content_type=resp.headers.get("Content-Type"), encoding=resp.encoding,
+                   etag=resp.headers.get("ETag"), last_modified=resp.headers.get("Last-Modified"))
+
+    def total_bytes(self) -> int:
+        conn = sqlite3.connect(self.index_file)
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM (SELECT DISTINCT blob, size FROM entries)").fetchone()[0]
+        conn.close()
+        return total
+
+    def evict(self):
+        if not self.max_bytes:
+            return
+        with self._lock:
+            conn = sqlite3.connect(self.index_file)
+            c = conn.cursor()
+            total = c.execute("SELECT COALESCE(SUM(size), 0) FROM (SELECT DISTINCT blob, size FROM entries)").fetchone()[0]
+            if total <= self.max_bytes:
+                conn.close()
+                return
+            removed_blobs = set()
+            for url, blob, size in c.execute("SELECT url, blob, size FROM entries ORDER BY last_access").fetchall():
+                if total <= self.max_bytes:
+                    break
+                c.execute("DELETE FROM entries WHERE url = ?", (url,))
+                if c.execute("SELECT 1 FROM entries WHERE blob = ? LIMIT 1", (blob,)).fetchone() is None:
+                    removed_blobs.add(blob)
+                    total -= size
+            conn.commit()
+            conn.close()
+        for blob in removed_blobs:
+            try:
+                os.remove(self._blob_path(blob))
+            except OSError:
+                pass
+
+    def get(self, session: requests.Session, url: str, headers: dict, timeout: int = 20,
+            rate_limiter: Optional["RateLimiter"] = None) -> requests.Response:
+        """Serve `url` from the cache, revalidating with ETag/Last-Modified unless offline."""
+        if self.offline:
+            resp = self.read(url)
+            if resp is None:
+                raise CacheMiss(f"Not in HTTP cache (offline): {url}")
+            return resp
+        validators = self.validators(url)
+        if rate_limiter is not None:
+            rate_limiter.wait()
+        resp = session.get(url, headers={**headers, **validators}, timeout=timeout)
+        if resp.status_code == 304:
+            cached = self.read(url)
+            if cached is not None:
+                return cached
+            if rate_limiter is not None:
+                rate_limiter.wait()
+            resp = session.get(url, headers=headers, timeout=timeout)
+        if resp.status_code == 200:
+            self.store_response(url, resp)
+        return resp
+
+
+class ArticlePage:
+    """
+    The parts of a PMC article page the fetcher needs (<img> and <meta> tag attributes),
+    pulled out with a regex tag scanner instead of building a full DOM.
+    Comments, <script> and <style> bodies are skipped like an HTML parser would.
+    """
+
+    _SKIP_RE = re.compile(r"<!--.*?-->|<(script|style)\b[^>]*>.*?</\1\s*>", re.S | re.I)
+    _TAG_RE = re.compile(r"<(img|meta)\b((?:[^>\"']|\"[^\"]*\"|'[^']*')*)>", re.I)
+    _ATTR_RE = re.compile(r"([^\s=/>\"']+)(?:\s*=\s*(?:\"([^\"]*)\"|'([^']*)'|([^\s>\"']+)))?")
+
+    def __init__(self, img_tags: List[dict], meta_tags: List[dict]):
+        self.img_tags = img_tags
+        self.meta_tags = meta_tags
+
+    @classmethod
+    def from_html(cls, html_text: str) -> "ArticlePage":
+        img_tags, meta_tags = [], []
+        html_text = cls._SKIP_RE.sub("", html_text)
+        for match in cls._TAG_RE.finditer(html_text):
+            attrs = {}
+            for name, dq, sq, bare in cls._ATTR_RE.findall(match.group(2)):
+                value = dq or sq or bare
+                attrs[name.lower()] = unescape(value) if "&" in value else value
+            (img_tags if match.group(1).lower() == "img" else meta_tags).append(attrs)
+        return cls(img_tags, meta_tags)
+
+
 class PMCMetadataFetcher:
     USER_AGENTS = [
         "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/134.0.6825.76 Safari/537.36",
@@ -40,16 +292,26 @@ class PMCMetadataFetcher:
     ]
 
     SESSION = make_session()
+    RATE_LIMITER: Optional[RateLimiter] = None
+    CACHE: Optional[ResponseCache] = None
 
     def __init__(self, pmc_id: str):
         self.pmc_id = pmc_id
         self.metadata = None
-        self._soup: Optional[BeautifulSoup] = None
+        self._page: Optional[ArticlePage] = None
 
     @staticmethod
     def random_headers() -> dict:
         return {"User-Agent": random.choice(PMCMetadataFetcher.USER_AGENTS)}
 
+    @classmethod
+    def http_get(cls, url: str, timeout: int = 20, use_cache: bool = True) -> requests.Response:
+        if cls.CACHE is not None and use_cache:
+            return cls.CACHE.get(cls.SESSION, url, cls.random_headers(), timeout=timeout, rate_limiter=cls.RATE_LIMITER)
+        if cls.RATE_LIMITER is not None:
+            cls.RATE_LIMITER.wait()
+        return cls.SESSION.get(url, headers=cls.random_headers(), timeout=timeout)
+
     @staticmethod
     def extract_text(elem) -> str:
         return "".join(elem.itertext()).strip() if elem is not None else ""
@@ -78,23 +340,27 @@ class PMCMetadataFetcher:
         except Exception:
             return "Unknown"
 
-    def _fetch_article_html_once(self) -> Optional[BeautifulSoup]:
-        if self._soup is not None:
-            return self._soup
+    def _fetch_article_html_once(self) -> Optional[ArticlePage]:
+        if self._page is not None:
+            return self._page
         url = f"https://www.ncbi.nlm.nih.gov/pmc/articles/{self.pmc_id}/"
         try:
-            resp = self.SESSION.get(url, headers=self.random_headers(), timeout=20)
+            resp = self.http_get(url)
             resp.raise_for_status()
-            self._soup = BeautifulSoup(resp.text, "html.parser")
-            return self._soup
+            self._page = ArticlePage.from_html(resp.text)
+            return self._page
+        except CacheMiss:
+            raise
         except Exception as e:
             print(f"[DEBUG] Failed HTML fetch for {self.pmc_id}: {e}")
-            self._soup = None
+            self._page = None
             return None
 
-    def fetch_images_from_soup(self, soup: BeautifulSoup) -> List[str]:
+    def fetch_images_from_page(self, page: ArticlePage) -> List[str]:
         images = []
-        for img in (soup.find_all("img", class_="graphic") + soup.find_all("img", class_="graphic zoom-in")):
+        for img in page.img_tags:
+            if "graphic" not in img.get("class", "").split():
+                continue
             src = img.get("src") or img.get("data-src")
             if not src:
                 continue
@@ -106,8 +372,8 @@ class PMCMetadataFetcher:
                 images.append(src)
         return list(dict.fromkeys(images))
 
-    def fetch_pdf_url_from_soup(self, soup: BeautifulSoup) -> Optional[str]:
-        tag = soup.find("meta", {"name": "citation_pdf_url"})
+    def fetch_pdf_url_from_page(self, page: ArticlePage) -> Optional[str]:
+        tag = next((m for m in page.meta_tags if m.get("name") == "citation_pdf_url"), None)
         if tag:
             pdf = tag.get("content")
             if pdf and pdf.startswith("/"):
@@ -115,13 +381,20 @@ class PMCMetadataFetcher:
             return pdf
         return None
 
-    def fetch_metadata_xml(self) -> dict:
-        xml_url = f"https://eutils.ncbi.nlm.nih.gov/entrez/eutils/efetch.fcgi?db=pmc&retmode=xml&id={self.pmc_id}"
-        resp = self.SESSION.get(xml_url, headers=self.random_headers(), timeout=20)
-        resp.raise_for_status()
+    @classmethod
+    def meta_pmcid(cls, meta) -> Optional[str]:
+        if meta is None:
+            return None
+        for article_id in meta.findall("article-id"):
+            if article_id.attrib.get("pub-id-type") in ("pmc", "pmcid"):
+                value = cls.extract_text(article_id)
+                if value:
+                    return value if value.upper().startswith("PMC") else f"PMC{value}"
+        return None
 
-        xml_root = ET.fromstring(resp.content)
-        front = xml_root.find(".//article/front")
+    @classmethod
+    def parse_front(cls, front) -> dict:
+        """Parse an article <front> element into the metadata fields that live in it."""
         meta = front.find("article-meta") if front is not None else None
         journal_meta = front.find("journal-meta") if front is not None else None
 
@@ -129,74 +402,253 @@ class PMCMetadataFetcher:
         if journal_meta is not None:
             publisher_elem = journal_meta.find("publisher/publisher-name")
             if publisher_elem is not None:
-                publisher_name = self.extract_text(publisher_elem)
+                publisher_name = cls.extract_text(publisher_elem)
 
-        title = self.extract_text(meta.find("title-group/article-title")) if meta is not None else "No title"
-        abstract = self.extract_text(meta.find("abstract/p")) if meta is not None else "No abstract"
+        title = cls.extract_text(meta.find("title-group/article-title")) if meta is not None else "No title"
+        abstract = cls.extract_text(meta.find("abstract/p")) if meta is not None else "No abstract"
 
         authors = []
         if meta is not None:
             for contrib in meta.findall("contrib-group/contrib"):
-                surname = self.extract_text(contrib.find("name/surname"))
-                given = self.extract_text(contrib.find("name/given-names"))
+                surname = cls.extract_text(contrib.find("name/surname"))
+                given = cls.extract_text(contrib.find("name/given-names"))
                 if surname or given:
                     authors.append(f"{given} {surname}".strip())
         if not authors:
             authors.append("No authors")
 
-        publication_date = self.parse_pub_date(meta) if meta is not None else "Unknown"
-
-        sections = {}
-        restricted_text = "does not allow downloading of the full text in XML form"
-        restricted = front is None or restricted_text in ET.tostring(front, encoding="unicode")
-        if not restricted:
-            for sec in xml_root.findall(".//body//sec"):
-                sec_title_elem = sec.find("title")
-                sec_title = self.extract_text(sec_title_elem).lower() if sec_title_elem is not None else ""
-                if "introduction" in sec_title or "conclusion" in sec_title:
-                    paragraphs = [self.extract_text(p) for p in sec.findall(".//p")]
-                    if paragraphs:
-                        sections[sec_title.split()[0]] = "\n".join(paragraphs)
+        publication_date = cls.parse_pub_date(meta) if meta is not None else "Unknown"
 
         keywords_list = []
         if meta is not None:
             for kwd_group in meta.findall("kwd-group"):
                 for kw in kwd_group.findall("kwd"):
-                    text = self.extract_text(kw)
+                    text = cls.extract_text(kw)
                     if text:
                         keywords_list.append(text)
 
-        soup = self._fetch_article_html_once()
-        images = self.fetch_images_from_soup(soup) if soup else []
-        pdf_url = self.fetch_pdf_url_from_soup(soup) if soup else None
-
-        self.metadata = {
+        return {
             "title": title.replace("▿", ""),
             "authors": authors,
             "publication_date": publication_date,
             "publisher": publisher_name,
             "keywords": keywords_list,
             "abstract": abstract,
-            "sections": sections,
-            "restricted": restricted,
-            "images": images,
-            "Pdf_URL": pdf_url
         }
-        return self.metadata
 
+    @classmethod
+    def iter_parse_articles(cls, source) -> Iterator[Tuple[Optional[str], dict]]:
+        """
+        Single-pass parse of an efetch response (bytes or a file object) holding one or many
+        <article> elements. Yields (pmcid, metadata) per article, without images/Pdf_URL.
 
-class KeywordExtractor:
-    _model = None
+        Only <front> is kept whole; each top-level body <sec> is inspected for
+        introduction/conclusion text when it closes and every other element is detached
+        from its parent as soon as it ends, so memory stays flat for very large articles.
+        """
+        if isinstance(source, (bytes, bytearray)):
+            source = io.BytesIO(source)
+        restricted_text = "does not allow downloading of the full text in XML form"
+
+        stack = []
+        article_depth = None
+        front, open_secs, found_sections, sec_order = None, [], [], 0
+        for event, elem in ET.iterparse(source, events=("start", "end")):
+            if event == "start":
+                stack.append(elem)
+                if elem.tag == "article" and article_depth is None:
+                    article_depth = len(stack)
+                    front, open_secs, found_sections, sec_order = None, [], [], 0
+                elif elem.tag == "sec" and article_depth is not None \
+                        and any(e.tag == "body" for e in stack[article_depth:-1]):
+                    open_secs.append((sec_order, elem))
+                    sec_order += 1
+                continue
+
+            stack.pop()
+            if article_depth is None:
+                continue
+            parent = stack[-1] if stack else None
+
+            if elem.tag == "article" and len(stack) == article_depth - 1:
+                restricted = front is None or restricted_text in "".join(front.itertext())
+                sections = {}
+                if not restricted:
+                    for _, key, text in sorted(found_sections):
+                        sections[key] = text
+                metadata = cls.parse_front(front)
+                metadata["sections"] = sections
+                metadata["restricted"] = restricted
+                yield cls.meta_pmcid(front.find("article-meta") if front is not None else None), metadata
+                if parent is not None:
+                    parent.remove(elem)
+                article_depth, front = None, None
+                continue
+
+            if elem.tag == "front" and len(stack) == article_depth:
+                front = elem
+                continue
+            if len(stack) > article_depth and stack[article_depth].tag == "front":
+                continue
+
+            if open_secs and open_secs[-1][1] is elem:
+                order, _ = open_secs.pop()
+                sec_title_elem = elem.find("title")
+                sec_title = cls.extract_text(sec_title_elem).lower() if sec_title_elem is not None else ""
+                if "introduction" in sec_title or "conclusion" in sec_title:
+                    paragraphs = [cls.extract_text(p) for p in elem.findall(".//p")]
+                    if paragraphs:
+                        found_sections.append((order, sec_title.split()[0], "\n".join(paragraphs)))
+            if not open_secs and parent is not None:
+                parent.remove(elem)
+
+    def _attach_html_metadata(self, metadata: dict) -> dict:
+        try:
+            page = self._fetch_article_html_once()
+        except CacheMiss as e:
+            # like a failed fetch online: the article is kept, just without images/PDF
+            print(f"[DEBUG] No cached HTML for {self.pmc_id}: {e}")
+            page = None
+        metadata["images"] = self.fetch_images_from_page(page) if page else []
+        metadata["Pdf_URL"] = self.fetch_pdf_url_from_page(page) if page else None
+        self.metadata = metadata
+        return metadata
+
+    @staticmethod
+    def efetch_url(pmc_ids: List[str]) -> str:
+        return f"{EFETCH_URL}?db=pmc&retmode=xml&id={','.join(pmc_ids)}"
+
+    def fetch_metadata_xml(self) -> dict:
+        resp = self.http_get(self.efetch_url([self.pmc_id]))
+        resp.raise_for_status()
+
+        metadata = next((m for _, m in self.iter_parse_articles(resp.content)), None)
+        if metadata is None:
+            metadata = self.parse_front(None)
+            metadata.update({"sections": {}, "restricted": True})
+        return self._attach_html_metadata(metadata)
 
     @classmethod
-    def get_model(cls):
-        if cls._model is None:
+    def fetch_metadata_batch(cls, pmc_ids: List[str], batch_size: int = EFETCH_BATCH_SIZE, include_html: bool = True) -> dict:
+        """
+        Fetch metadata for many PMCIDs with one efetch call per `batch_size` ids.
+        Returns {pmcid: metadata}; ids that efetch did not return are left out.
+
+        With a CACHE, each PMCID's single-id efetch URL is aliased to the cached batch
+        response so an offline re-parse works whatever batch size the original crawl used.
+        """
+        results = {}
+        for i in range(0, len(pmc_ids), max(1, batch_size)):
+            chunk = pmc_ids[i:i + max(1, batch_size)]
+            if cls.CACHE is not None and cls.CACHE.offline:
+                bodies = []
+                for url in dict.fromkeys(cls.CACHE.resolve(cls.efetch_url([pmcid])) for pmcid in chunk):
+                    resp = cls.CACHE.read(url)
+                    if resp is not None:
+                        bodies.append(resp.content)
+            else:
+                batch_url = cls.efetch_url(chunk)
+                resp = cls.http_get(batch_url, timeout=60)
+                resp.raise_for_status()
+                bodies = [resp.content]
+
+            wanted = set(chunk)
+            for body in bodies:
+                for pmcid, metadata in cls.iter_parse_articles(body):
+                    if pmcid is None and len(chunk) == 1:
+                        pmcid = chunk[0]
+                    if pmcid not in wanted or pmcid in results:
+                        continue
+                    if cls.CACHE is not None and not cls.CACHE.offline and len(chunk) > 1:
+                        cls.CACHE.alias(cls.efetch_url([pmcid]), batch_url)
+                    if include_html:
+                        metadata = cls(pmcid)._attach_html_metadata(metadata)
+                    results[pmcid] = metadata
+        return results
+
+
+class LazyModel:
+    """
+    A model built on first use, or ahead of time by warm_up() in a background thread, instead
+    of at import time. Calling the wrapper calls the model, loading it first if needed.
+    A failed load is reported in status() and retried on the next call.
+    """
+
+    def __init__(self, name: str, factory):
+        self.name = name
+        self.factory = factory
+        self.model = None
+        self.state = "not_loaded"
+        self.error: Optional[str] = None
+        self.load_seconds: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        if self.model is not None:
+            return self.model
+        with self._lock:
+            if self.model is None:
+                self.state = "loading"
+                start_time = time.time()
+                print(f"[DEBUG] Loading {self.name}")
+                try:
+                    self.model = self.factory()
+                except Exception as e:
+                    self.state, self.error = "failed", str(e)
+                    print(f"[ERROR] Loading {self.name} failed: {e}")
+                    raise
+                self.load_seconds = time.time() - start_time
+                self.state, self.error = "ready", None
+                print(f"[DEBUG] Loaded {self.name} in {self.load_seconds:.2f} sec")
+        return self.model
+
+    def __call__(self, *args, **kwargs):
+        return self.get()(*args, **kwargs)
+
+    def warm_up(self) -> threading.Thread:
+        def load():
             try:
-                from keybert import KeyBERT
-                cls._model = KeyBERT(model="all-MiniLM-L6-v2")
+                self.get()
             except Exception:
-                cls._model = None
-        return cls._model
+                pass
+        if self.state == "not_loaded":
+            self.state = "loading"
+        thread = threading.Thread(target=load, name=f"warm-up-{self.name}", daemon=True)
+        thread.start()
+        return thread
+
+    def status(self) -> dict:
+        return {"state": self.state, "error": self.error, "load_seconds": self.load_seconds}
+
+
+def _load_sentence_model():
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(SENTENCE_MODEL_NAME, device="cpu")
+
+
+# one sentence-transformers model shared by keyword extraction and semantic search
+SENTENCE_MODEL = LazyModel("sentence embedder", _load_sentence_model)
+
+
+def _load_keybert():
+    from keybert import KeyBERT
+    return KeyBERT(model=SENTENCE_MODEL.get())
+
+
+def encode_texts(texts: List[str], batch_size: int = 64):
+    """Normalized sentence embeddings (rows of unit length) for `texts`."""
+    return SENTENCE_MODEL.get().encode(texts, batch_size=batch_size, normalize_embeddings=True, convert_to_numpy=True)
+
+
+class KeywordExtractor:
+    MODEL = LazyModel("KeyBERT", _load_keybert)
+
+    @classmethod
+    def get_model(cls):
+        try:
+            return cls.MODEL.get()
+        except Exception:
+            return None
 
     @classmethod
     def extract_keywords(cls, text: str, total_keywords: int = 3) -> List[str]:
@@ -209,44 +661,234 @@ class KeywordExtractor:
 
 
 class PMCDatabase:
+    # SQLite caps bound parameters per statement; keep IN (...) lists well below it
+    MAX_SQL_PARAMS = 500
+    # bumped whenever _migrate learns a new step; stored in PRAGMA user_version
+    SCHEMA_VERSION = 2
+    # bm25 column weights for articles_fts (pmcid, title, abstract, keywords, sections)
+    FTS_WEIGHTS = (0.0, 10.0, 5.0, 5.0, 1.0)
+
     def __init__(self, db_file):
         self.db_file = db_file
+        self._local = threading.local()
         self._create_db()
 
+    def connection(self) -> sqlite3.Connection:
+        """Per-thread connection, opened once and reused, in WAL mode so readers don't block the writer."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_file, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._local.conn = conn
+        return conn
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
     def _create_db(self):
-        conn = sqlite3.connect(self.db_file)
-        c = conn.cursor()
-        c.execute("""
-        CREATE TABLE IF NOT EXISTS articles (
-            pmcid TEXT PRIMARY KEY,
-            title TEXT,
-            authors TEXT,
-            publication_date TEXT,
-            publisher TEXT,
-            keywords TEXT,
-            abstract TEXT,
-            sections TEXT,
-            restricted INTEGER,
-            images TEXT,
-            Pdf_URL TEXT
-        )
-        """)
-        conn.commit()
-        conn.close()
+        conn = self.connection()
+        with conn:
+            conn.execute("""
+            CREATE TABLE IF NOT EXISTS articles (
+                pmcid TEXT PRIMARY KEY,
+                title TEXT,
+                authors TEXT,
+                publication_date TEXT,
+                publisher TEXT,
+                keywords TEXT,
+                abstract TEXT,
+                sections TEXT,
+                restricted INTEGER,
+                images TEXT,
+                Pdf_URL TEXT
+            )
+            """)
+            # per-PMCID ingestion state: status is 'done' or 'failed', last_fetched is a unix timestamp
+            conn.execute("""
+            CREATE TABLE IF NOT EXISTS crawl_state (
+                pmcid TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                last_fetched REAL,
+                content_hash TEXT,
+                error TEXT
+            )
+            """)
+            # articles ingested before crawl_state existed count as done with an unknown fetch time
+            conn.execute("""
+            INSERT OR IGNORE INTO crawl_state (pmcid, status)
+            SELECT pmcid, 'done' FROM articles
+            """)
+            # normalized authors/keywords/images; these are what fetch_filtered reads, the JSON
+            # columns on articles are still written so older readers of the DB keep working
+            conn.executescript("""
+            CREATE TABLE IF NOT EXISTS authors (
+                id INTEGER PRIMARY KEY,
+                name TEXT NOT NULL UNIQUE,
+                name_norm TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS keywords (
+                id INTEGER PRIMARY KEY,
+                keyword TEXT NOT NULL UNIQUE,
+                keyword_norm TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS article_authors (
+                pmcid TEXT NOT NULL,
+                author_id INTEGER NOT NULL,
+                position INTEGER NOT NULL,
+                PRIMARY KEY (pmcid, position)
+            );
+            CREATE TABLE IF NOT EXISTS article_keywords (
+                pmcid TEXT NOT NULL,
+                keyword_id INTEGER NOT NULL,
+                position INTEGER NOT NULL,
+                PRIMARY KEY (pmcid, position)
+            );
+            CREATE TABLE IF NOT EXISTS images (
+                pmcid TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                url TEXT NOT NULL,
+                PRIMARY KEY (pmcid, position)
+            );
+            CREATE INDEX IF NOT EXISTS idx_authors_name_norm ON authors(name_norm);
+            CREATE INDEX IF NOT EXISTS idx_keywords_keyword_norm ON keywords(keyword_norm);
+            CREATE INDEX IF NOT EXISTS idx_article_authors_author ON article_authors(author_id);
+            CREATE INDEX IF NOT EXISTS idx_article_keywords_keyword ON article_keywords(keyword_id);
+            CREATE INDEX IF NOT EXISTS idx_articles_publication_date ON articles(publication_date);
+            CREATE INDEX IF NOT EXISTS idx_articles_publisher ON articles(publisher);
+            """)
+            # full-text index, kept in sync by insert_many
+            conn.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts USING fts5(
+                pmcid UNINDEXED, title, abstract, keywords, sections,
+                tokenize = 'unicode61 remove_diacritics 2',
+                prefix = '2 3'
+            )
+            """)
+            # generated summaries, keyed by everything that changes the output
+            conn.execute("""
+            CREATE TABLE IF NOT EXISTS summaries (
+                pmcid TEXT NOT NULL,
+                text_hash TEXT NOT NULL,
+                model TEXT NOT NULL,
+                min_length INTEGER NOT NULL,
+                max_length INTEGER NOT NULL,
+                summary TEXT NOT NULL,
+                created_at REAL,
+                PRIMARY KEY (pmcid, text_hash, model, min_length, max_length)
+            )
+            """)
+            # knowledge-graph analytics from graph_analytics.py; articles are keyed by pmcid,
+            # authors/keywords by their graph node id (author_<name>, keyword_<kw>)
+            conn.execute("""
+            CREATE TABLE IF NOT EXISTS kg_nodes (
+                node_key TEXT PRIMARY KEY,
+                grp TEXT NOT NULL,
+                degree INTEGER NOT NULL,
+                pagerank REAL NOT NULL,
+                community INTEGER NOT NULL
+            )
+            """)
+            conn.execute("""
+            CREATE TABLE IF NOT EXISTS related_articles (
+                pmcid TEXT NOT NULL,
+                rank INTEGER NOT NULL,
+                related_pmcid TEXT NOT NULL,
+                score REAL NOT NULL,
+                PRIMARY KEY (pmcid, rank)
+            )
+            """)
+        self._migrate(conn)
+
+    def _migrate(self, conn: sqlite3.Connection):
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        if version < 1:
+            # backfill the normalized tables from the JSON columns of existing rows
+            rows = conn.execute("SELECT pmcid, authors, keywords, images FROM articles").fetchall()
+            with conn:
+                self._write_relations(conn, [
+                    (pmcid, json.loads(authors or "[]"), json.loads(keywords or "[]"), json.loads(images or "[]"))
+                    for pmcid, authors, keywords, images in rows
+                ])
+            print(f"[DEBUG] Migrated {len(rows)} article(s) to normalized authors/keywords/images")
+        if version < 2:
+            pmcids = [pmcid for (pmcid,) in conn.execute("SELECT pmcid FROM articles")]
+            with conn:
+                self._write_fts(conn, pmcids)
+            print(f"[DEBUG] Built full-text index for {len(pmcids)} article(s)")
+        if version < self.SCHEMA_VERSION:
+            conn.execute(f"PRAGMA user_version = {self.SCHEMA_VERSION}")
+
+    @staticmethod
+    def content_hash(data: dict) -> str:
+        return hashlib.sha256(json.dumps(data, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+    def get_crawl_state(self) -> dict:
+        rows = self.connection().execute(
+            "SELECT pmcid, status, attempts, last_fetched, content_hash, error FROM crawl_state"
+        ).fetchall()
+        return {
+            pmcid: {"status": status, "attempts": attempts, "last_fetched": last_fetched,
+                    "content_hash": content_hash, "error": error}
+            for pmcid, status, attempts, last_fetched, content_hash, error in rows
+        }
+
+    @staticmethod
+    def _mark_crawl_rows(conn: sqlite3.Connection, entries: List[tuple]):
+        """entries: (pmcid, status, last_fetched, content_hash, error); caller owns the transaction."""
+        conn.executemany("""
+        INSERT INTO crawl_state (pmcid, status, attempts, last_fetched, content_hash, error)
+        VALUES (?, ?, 1, ?, ?, ?)
+        ON CONFLICT(pmcid) DO UPDATE SET
+            status = excluded.status,
+            attempts = crawl_state.attempts + 1,
+            last_fetched = excluded.last_fetched,
+            content_hash = COALESCE(excluded.content_hash, crawl_state.content_hash),
+            error = excluded.error
+        """, entries)
+
+    def mark_crawl(self, pmcid: str, status: str, content_hash: Optional[str] = None, error: Optional[str] = None):
+        conn = self.connection()
+        with conn:
+            self._mark_crawl_rows(conn, [(pmcid, status, time.time(), content_hash, error)])
+
+    def pending_pmcids(self, pmcids: List[str], max_age: Optional[float] = None) -> List[str]:
+        """
+        Return the PMCIDs that still need fetching: never seen, failed, or (when `max_age`
+        seconds is given) done longer ago than that. Order of `pmcids` is preserved.
+        """
+        state = self.get_crawl_state()
+        now = time.time()
+        pending = []
+        for pmcid in pmcids:
+            entry = state.get(pmcid)
+            if entry is None or entry["status"] != "done":
+                pending.append(pmcid)
+            elif max_age is not None and (entry["last_fetched"] is None or now - entry["last_fetched"] > max_age):
+                pending.append(pmcid)
+        return pending
 
-    def insert_article(self, pmcid: str, enable_auto_keyword_generation: bool = False, total_extracted_keywords: int = 3):
-        fetcher = PMCMetadataFetcher(pmcid)
-        data = fetcher.fetch_metadata_xml()
-        if not data['keywords'] and enable_auto_keyword_generation:
-            data['keywords'] = KeywordExtractor.extract_keywords(data['title'], total_extracted_keywords)
-
-        conn = sqlite3.connect(self.db_file)
-        c = conn.cursor()
-        c.execute("""
-        INSERT OR REPLACE INTO articles (
-            pmcid, title, authors, publication_date, publisher, keywords, abstract, sections, restricted, images, Pdf_URL
-        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
+    def _stored_hashes(self, pmcids: List[str]) -> dict:
+        """{pmcid: content_hash} for PMCIDs that have both an article row and a recorded hash."""
+        conn = self.connection()
+        hashes = {}
+        for i in range(0, len(pmcids), self.MAX_SQL_PARAMS):
+            chunk = pmcids[i:i + self.MAX_SQL_PARAMS]
+            placeholders = ",".join("?" for _ in chunk)
+            hashes.update(conn.execute(f"""
+            SELECT s.pmcid, s.content_hash FROM crawl_state s JOIN articles a ON a.pmcid = s.pmcid
+            WHERE s.pmcid IN ({placeholders}) AND s.content_hash IS NOT NULL
+            """, chunk).fetchall())
+        return hashes
+
+    @staticmethod
+    def _article_row(pmcid: str, data: dict) -> tuple:
+        return (
             pmcid,
             data["title"],
             json.dumps(data["authors"]),
@@ -258,23 +900,228 @@ class PMCDatabase:
             int(data["restricted"]),
             json.dumps(data["images"]),
             data.get("Pdf_URL")
-        ))
-        conn.commit()
-        conn.close()
-        print(f"[DEBUG] Inserted PMCID: {pmcid}, Title: {data['title']}, Publisher: {data.get('publisher')}")
+        )
+
+    @staticmethod
+    def _lookup_ids(conn: sqlite3.Connection, table: str, column: str, values: List[str], chunk_size: int) -> dict:
+        ids = {}
+        for i in range(0, len(values), chunk_size):
+            chunk = values[i:i + chunk_size]
+            placeholders = ",".join("?" for _ in chunk)
+            ids.update((v, id_) for id_, v in conn.execute(
+                f"SELECT id, {column} FROM {table} WHERE {column} IN ({placeholders})", chunk))
+        return ids
+
+    def _write_relations(self, conn: sqlite3.Connection, entries: List[tuple]):
+        """entries: (pmcid, authors, keywords, images); replaces existing rows. Caller owns the transaction."""
+        if not entries:
+            return
+        pmcids = [e[0] for e in entries]
+        for table in ("article_authors", "article_keywords", "images"):
+            for i in range(0, len(pmcids), self.MAX_SQL_PARAMS):
+                chunk = pmcids[i:i + self.MAX_SQL_PARAMS]
+                conn.execute(f"DELETE FROM {table} WHERE pmcid IN ({','.join('?' for _ in chunk)})", chunk)
+
+        names = list(dict.fromkeys(a for e in entries for a in e[1] if isinstance(a, str) and a))
+        kws = list(dict.fromkeys(k for e in entries for k in e[2] if isinstance(k, str) and k))
+        conn.executemany("INSERT OR IGNORE INTO authors (name, name_norm) VALUES (?, ?)",
+                         [(n, n.lower().strip()) for n in names])
+        conn.executemany("INSERT OR IGNORE INTO keywords (keyword, keyword_norm) VALUES (?, ?)",
+                         [(k, k.lower().strip()) for k in kws])
+        author_ids = self._lookup_ids(conn, "authors", "name", names, self.MAX_SQL_PARAMS)
+        keyword_ids = self._lookup_ids(conn, "keywords", "keyword", kws, self.MAX_SQL_PARAMS)
+
+        conn.executemany("INSERT INTO article_authors (pmcid, author_id, position) VALUES (?, ?, ?)", [
+            (pmcid, author_ids[a], pos)
+            for pmcid, authors, _, _ in entries
+            for pos, a in enumerate(a for a in authors if a in author_ids)
+        ])
+        conn.executemany("INSERT INTO article_keywords (pmcid, keyword_id, position) VALUES (?, ?, ?)", [
+            (pmcid, keyword_ids[k], pos)
+            for pmcid, _, keywords, _ in entries
+            for pos, k in enumerate(k for k in keywords if k in keyword_ids)
+        ])
+        conn.executemany("INSERT INTO images (pmcid, position, url) VALUES (?, ?, ?)", [
+            (pmcid, pos, url)
+            for pmcid, _, _, images in entries
+            for pos, url in enumerate(u for u in images if isinstance(u, str) and u)
+        ])
+
+    def _write_fts(self, conn: sqlite3.Connection, pmcids: List[str]):
+        """Re-index `pmcids` in articles_fts from articles + keywords. Caller owns the transaction."""
+        for i in range(0, len(pmcids), self.MAX_SQL_PARAMS):
+            chunk = pmcids[i:i + self.MAX_SQL_PARAMS]
+            placeholders = ",".join("?" for _ in chunk)
+            conn.execute(f"DELETE FROM articles_fts WHERE pmcid IN ({placeholders})", chunk)
+            rows = conn.execute(f"""
+            SELECT a.pmcid, a.title, a.abstract,
+                (SELECT group_concat(kw.keyword, ', ') FROM article_keywords ak
+                 JOIN keywords kw ON kw.id = ak.keyword_id WHERE ak.pmcid = a.pmcid),
+                a.sections
+            FROM articles a WHERE a.pmcid IN ({placeholders})
+            """, chunk).fetchall()
+            conn.executemany("INSERT INTO articles_fts (pmcid, title, abstract, keywords, sections) VALUES (?, ?, ?, ?, ?)", [
+                (pmcid, title, abstract, keywords, "\n".join(json.loads(sections).values()) if sections else None)
+                for pmcid, title, abstract, keywords, sections in rows
+            ])
+
+    @staticmethod
+    def fts_query(text: str) -> str:
+        """
+        Turn free text into an FTS5 MATCH expression. "Quoted text" stays a phrase, a
+        trailing * makes a prefix query, and all terms must match. The last unquoted word
+        is always a prefix, so a half-typed word (hindl) already finds Hindlimb. Punctuation
+        inside a word (e.g. sex-based) becomes a phrase of its parts.
+        """
+        terms = []
+        matches = [m for m in re.findall(r'"([^"]+)"|(\S+)', text or "") if re.search(r"\w", m[0] or m[1])]
+        for i, (phrase, word) in enumerate(matches):
+            term = '"' + " ".join(re.findall(r"\w+", phrase or word)) + '"'
+            if word.endswith("*") or (word and i == len(matches) - 1):
+                term += "*"
+            terms.append(term)
+        return " ".join(terms)
+
+    def search(self, query: str, limit: Optional[int] = None) -> List[Tuple[str, float]]:
+        """BM25-ranked (pmcid, score) pairs for `query`, best first (lower score is better)."""
+        match = self.fts_query(query)
+        if not match:
+            return []
+        weights = ", ".join(str(w) for w in self.FTS_WEIGHTS)
+        sql = f"""
+        SELECT pmcid, bm25(articles_fts, {weights}) AS score
+        FROM articles_fts WHERE articles_fts MATCH ? ORDER BY score
+        """
+        params = [match]
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+        return self.connection().execute(sql, params).fetchall()
+
+    def insert_many(self, articles: List[Tuple[str, dict]], enable_auto_keyword_generation: bool = False,
+                    total_extracted_keywords: int = 3) -> List[str]:
+        """
+        Store already-fetched (pmcid, metadata) pairs in a single transaction.
+        Articles whose content hash is unchanged are only re-marked as done.
+        Returns the PMCIDs whose rows were (re)written.
+        """
+        if not articles:
+            return []
+        # a PMCID listed twice would write its relation rows twice; the last copy wins
+        articles = list(dict(articles).items())
+        digests = {pmcid: self.content_hash(data) for pmcid, data in articles}
+        stored = self._stored_hashes(list(digests))
+
+        rows, relations, written = [], [], []
+        for pmcid, data in articles:
+            if stored.get(pmcid) == digests[pmcid]:
+                continue
+            if not data['keywords'] and enable_auto_keyword_generation:
+                data['keywords'] = KeywordExtractor.extract_keywords(data['title'], total_extracted_keywords)
+            rows.append(self._article_row(pmcid, data))
+            relations.append((pmcid, data["authors"], data["keywords"], data["images"]))
+            written.append(pmcid)
+
+        now = time.time()
+        conn = self.connection()
+        with conn:
+            conn.executemany("""
+            INSERT OR REPLACE INTO articles (
+                pmcid, title, authors, publication_date, publisher, keywords, abstract, sections, restricted, images, Pdf_URL
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, rows)
+            self._write_relations(conn, relations)
+            self._write_fts(conn, written)
+            self._mark_crawl_rows(conn, [(pmcid, "done", now, digest, None) for pmcid, digest in digests.items()])
+        print(f"[DEBUG] Stored {len(written)} article(s), {len(digests) - len(written)} unchanged")
+        return written
 
+    def insert_article(self, pmcid: str, enable_auto_keyword_generation: bool = False, total_extracted_keywords: int = 3,
+                       data: Optional[dict] = None) -> bool:
+        """Fetch (unless `data` is given) and store one article. Returns False when the content was unchanged."""
+        if data is None:
+            data = PMCMetadataFetcher(pmcid).fetch_metadata_xml()
+        written = self.insert_many([(pmcid, data)], enable_auto_keyword_generation, total_extracted_keywords)
+        if written:
+            print(f"[DEBUG] Inserted PMCID: {pmcid}, Title: {data['title']}, Publisher: {data.get('publisher')}")
+        return bool(written)
+
+    def fetch_summary(self, pmcid: str, text_hash: str, model: str, min_length: int, max_length: int) -> Optional[str]:
+        row = self.connection().execute("""
+        SELECT summary FROM summaries
+        WHERE pmcid = ? AND text_hash = ? AND model = ? AND min_length = ? AND max_length = ?
+        """, (pmcid, text_hash, model, min_length, max_length)).fetchone()
+        return row[0] if row else None
+
+    def store_summary(self, pmcid: str, text_hash: str, model: str, min_length: int, max_length: int, summary: str):
+        """
+        Store a summary and drop the article's summaries of an older text. Summaries of the
+        same text from other model keys (backends, greedy streaming) are kept.
+        """
+        conn = self.connection()
+        with conn:
+            conn.execute("DELETE FROM summaries WHERE pmcid = ? AND text_hash != ?", (pmcid, text_hash))
+            conn.execute("""
+            INSERT OR REPLACE INTO summaries (pmcid, text_hash, model, min_length, max_length, summary, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, (pmcid, text_hash, model, min_length, max_length, summary, time.time()))
+
+    def store_graph_analytics(self, node_rows: List[tuple], related_rows: List[tuple]):
+        """
+        Replace the stored analytics. node_rows are (node_key, grp, degree, pagerank, community),
+        related_rows are (pmcid, rank, related_pmcid, score).
+        """
+        conn = self.connection()
+        with conn:
+            conn.execute("DELETE FROM kg_nodes")
+            conn.execute("DELETE FROM related_articles")
+            conn.executemany("INSERT INTO kg_nodes (node_key, grp, degree, pagerank, community) VALUES (?, ?, ?, ?, ?)",
+                             node_rows)
+            conn.executemany("INSERT INTO related_articles (pmcid, rank, related_pmcid, score) VALUES (?, ?, ?, ?)",
+                             related_rows)
+
+    def fetch_graph_analytics(self) -> Tuple[dict, dict]:
+        """({node_key: (grp, degree, pagerank, community)}, {pmcid: [(related_pmcid, score), ...] best first})."""
+        conn = self.connection()
+        nodes = {key: (grp, degree, pagerank, community) for key, grp, degree, pagerank, community in
+                 conn.execute("SELECT node_key, grp, degree, pagerank, community FROM kg_nodes")}
+        related = {}
+        for pmcid, related_pmcid, score in conn.execute(
+                "SELECT pmcid, related_pmcid, score FROM related_articles ORDER BY pmcid, rank"):
+            related.setdefault(pmcid, []).append((related_pmcid, score))
+        return nodes, related
 
     def fetch_filtered(self, **filters) -> List[dict]:
-        conn = sqlite3.connect(self.db_file)
-        c = conn.cursor()
+        """
+        Return articles matching every filter. `authors` and `keyword` match a whole name
+        case-insensitively through the normalized tables, `year` is an indexed range on
+        publication_date, and `search` is a full-text query whose results come back in
+        BM25 order; the other keys keep their substring semantics.
+        """
         conditions, values = [], []
+        ranks = None
         for key, value in filters.items():
-            if key == "title":
+            if key == "search":
+                # one MATCH for both the ranking and the filter, the ids go back in as a JSON array
+                ranks = {pmcid: rank for rank, (pmcid, _) in enumerate(self.search(value))}
+                conditions.append("pmcid IN (SELECT value FROM json_each(?))")
+                values.append(json.dumps(list(ranks)))
+            elif key == "title":
                 conditions.append("LOWER(title) LIKE ?")
                 values.append(f"%{value.lower()}%")
             elif key == "authors":
-                conditions.append("authors LIKE ?")
-                values.append(f"%{value}%")
+                conditions.append("""pmcid IN (
+                    SELECT aa.pmcid FROM article_authors aa JOIN authors au ON au.id = aa.author_id
+                    WHERE au.name_norm = ?)""")
+                values.append(value.lower().strip())
+            elif key == "keyword":
+                conditions.append("""pmcid IN (
+                    SELECT ak.pmcid FROM article_keywords ak JOIN keywords kw ON kw.id = ak.keyword_id
+                    WHERE kw.keyword_norm = ?)""")
+                values.append(value.lower().strip())
+            elif key == "year":
+                conditions.append("publication_date >= ? AND publication_date < ?")
+                values.extend([f"{int(value):04d}", f"{int(value) + 1:04d}"])
             elif key == "publication_date":
                 conditions.append("publication_date LIKE ?")
                 values.append(f"%{value}%")
@@ -294,27 +1141,95 @@ class PMCDatabase:
                     values.append(value)
             else:
                 raise ValueError(f"Unsupported filter key: {key}")
-        query = "SELECT * FROM articles"
-        if conditions:
-            query += " WHERE " + " AND ".join(conditions)
-        c.execute(query, values)
-        rows = c.fetchall()
-        conn.close()
-        return [self._row_to_dict(row) for row in rows]
+        where = " WHERE " + " AND ".join(conditions) if conditions else ""
+        conn = self.connection()
+        rows = conn.execute(f"""
+        SELECT pmcid, title, publication_date, publisher, abstract, sections, restricted, Pdf_URL
+        FROM articles{where}
+        """, values).fetchall()
+
+        subset = f" WHERE r.pmcid IN (SELECT pmcid FROM articles{where})" if conditions else ""
+        related = self._related_lists(conn, ("authors", "keywords", "images"), subset, values)
+        if ranks is not None:
+            rows.sort(key=lambda row: ranks.get(row[0], len(ranks)))
+        return [self._row_to_dict(row, related) for row in rows]
+
+    RELATED_QUERIES = {
+        "authors": "SELECT r.pmcid, au.name FROM article_authors r JOIN authors au ON au.id = r.author_id",
+        "keywords": "SELECT r.pmcid, kw.keyword FROM article_keywords r JOIN keywords kw ON kw.id = r.keyword_id",
+        "images": "SELECT r.pmcid, r.url FROM images r",
+    }
+
+    def _related_lists(self, conn: sqlite3.Connection, fields, subset: str = "", values=()) -> dict:
+        """{field: {pmcid: [values in position order]}} from the normalized tables"""
+        related = {}
+        for field in fields:
+            by_pmcid = related[field] = {}
+            for pmcid, value in conn.execute(f"{self.RELATED_QUERIES[field]}{subset} ORDER BY r.pmcid, r.position", values):
+                by_pmcid.setdefault(pmcid, []).append(value)
+        return related
+
+    def fetch_catalog(self) -> List[dict]:
+        """
+        Every article without its large fields: abstract and sections become has_abstract /
+        has_sections flags and images only the first one plus a count. Same order as
+        fetch_filtered(); the full text of one article comes from fetch_text().
+        """
+        conn = self.connection()
+        rows = conn.execute("""
+        SELECT pmcid, title, publication_date, publisher, restricted, Pdf_URL,
+               COALESCE(abstract, '') != '', COALESCE(sections, '') NOT IN ('', '{}', 'null')
+        FROM articles
+        """).fetchall()
+        related = self._related_lists(conn, ("authors", "keywords"))
+        images = dict(conn.execute("""
+        SELECT r.pmcid, r.url FROM images r
+        JOIN (SELECT pmcid, MIN(position) AS position FROM images GROUP BY pmcid) f
+          ON f.pmcid = r.pmcid AND f.position = r.position
+        """).fetchall())
+        image_counts = dict(conn.execute("SELECT pmcid, COUNT(*) FROM images GROUP BY pmcid").fetchall())
+        return [{
+            "pmcid": pmcid,
+            "title": title,
+            "authors": related["authors"].get(pmcid, []),
+            "publication_date": pub_date,
+            "publisher": publisher,
+            "keywords": related["keywords"].get(pmcid, []),
+            "restricted": bool(restricted),
+            "Pdf_URL": pdf_url,
+            "has_abstract": bool(has_abstract),
+            "has_sections": bool(has_sections),
+            "image": images.get(pmcid),
+            "image_count": image_counts.get(pmcid, 0),
+        } for pmcid, title, pub_date, publisher, restricted, pdf_url, has_abstract, has_sections in rows]
+
+    def fetch_text(self, pmcid: str) -> Optional[dict]:
+        """{"abstract", "sections", "images"} of one article, the fields fetch_catalog() leaves out"""
+        conn = self.connection()
+        row = conn.execute("SELECT abstract, sections FROM articles WHERE pmcid = ?", (pmcid,)).fetchone()
+        if row is None:
+            return None
+        abstract, sections_json = row
+        images = [url for (url,) in conn.execute("SELECT url FROM images WHERE pmcid = ? ORDER BY position", (pmcid,))]
+        return {
+            "abstract": abstract,
+            "sections": json.loads(sections_json) if sections_json else {},
+            "images": images,
+        }
 
-    def _row_to_dict(self, row) -> dict:
-        pmcid, title, authors_json, pub_date, publisher, keywords_json, abstract, sections_json, restricted, images_json, pdf_url = row
+    def _row_to_dict(self, row, related: dict) -> dict:
+        pmcid, title, pub_date, publisher, abstract, sections_json, restricted, pdf_url = row
         return {
             "pmcid": pmcid,
             "title": title,
-            "authors": json.loads(authors_json) if authors_json else [],
+            "authors": related["authors"].get(pmcid, []),
             "publication_date": pub_date,
             "publisher": publisher,
-            "keywords": json.loads(keywords_json) if keywords_json else [],
+            "keywords": related["keywords"].get(pmcid, []),
             "abstract": abstract,
             "sections": json.loads(sections_json) if sections_json else {},
             "restricted": bool(restricted),
-            "images": json.loads(images_json) if images_json else [],
+            "images": related["images"].get(pmcid, []),
             "Pdf_URL": pdf_url
         }
 
@@ -323,11 +1238,13 @@ class PMCDatabase:
 
 
 class PMCPipeline:
-    def __init__(self, db_file: str, csv_file: str, csv_url: str = None):
+    def __init__(self, db_file: str, csv_file: str, csv_url: str = None, cache_dir: Optional[str] = None,
+                 cache_max_bytes: int = HTTP_CACHE_MAX_BYTES):
         self.db_file = db_file
         self.csv_file = csv_file
         self.csv_url = csv_url
         self.pmc_db = PMCDatabase(db_file)
+        self.cache = ResponseCache(cache_dir, max_bytes=cache_max_bytes) if cache_dir else None
 
     def download_csv(self) -> bool:
         if os.path.exists(self.csv_file):
@@ -345,40 +1262,156 @@ class PMCPipeline:
         print(f"[DEBUG] CSV downloaded: {self.csv_file}")
         return True
 
-    def process_articles(self):
+    @staticmethod
+    def _new_result(idx: int, url) -> dict:
+        result = {"line": idx + 1, "url": url, "pmcid": None, "ok": False, "skipped": False, "error": None, "elapsed": 0.0}
+        match = re.search(r"(PMC\d+)", str(url))
+        if match:
+            result["pmcid"] = match.group(1)
+        else:
+            result["error"] = "No PMCID found in URL"
+        return result
+
+    def _ingest_batch(self, results: List[dict]) -> List[dict]:
+        pmcids = [r["pmcid"] for r in results if r["pmcid"] is not None]
+        start_time = time.time()
+        try:
+            fetched = PMCMetadataFetcher.fetch_metadata_batch(pmcids, batch_size=len(pmcids)) if pmcids else {}
+        except Exception as e:
+            fetched, batch_error = {}, str(e)
+        else:
+            batch_error = "PMCID not returned by efetch"
+
+        to_store = [r for r in results if r["pmcid"] is not None and r["pmcid"] in fetched]
+        try:
+            self.pmc_db.insert_many([(r["pmcid"], fetched[r["pmcid"]]) for r in to_store], enable_auto_keyword_generation=True)
+            for result in to_store:
+                result["ok"] = True
+        except Exception as e:
+            for result in to_store:
+                result["error"] = str(e)
+
+        for result in results:
+            if result["pmcid"] is not None and result["pmcid"] not in fetched:
+                result["error"] = batch_error
+            if result["pmcid"] is not None and not result["ok"]:
+                self.pmc_db.mark_crawl(result["pmcid"], "failed", error=result["error"])
+            result["elapsed"] = time.time() - start_time
+        return results
+
+    def process_articles(self, workers: int = 1, requests_per_second: float = NCBI_REQUESTS_PER_SECOND,
+                         batch_size: int = 1, resume: bool = True, max_age: Optional[float] = None) -> List[dict]:
+        """
+        Ingest every article listed in the CSV and return one result dict per line:
+        {"line", "url", "pmcid", "ok", "skipped", "error", "elapsed"}, ordered by CSV line.
+
+        `workers` > 1 fetches articles on a bounded thread pool; all HTTP calls share a
+        global `requests_per_second` budget so the crawl stays within NCBI's limits.
+        `batch_size` > 1 pulls that many articles per efetch call.
+        With `resume`, PMCIDs already marked done in crawl_state are skipped unless they
+        are older than `max_age` seconds; failed ones are retried.
+        """
         df = pd.read_csv(self.csv_file)
         urls = df['Link'].tolist()
-        total_errors = ""
+        workers = max(1, int(workers))
+        batch_size = max(1, int(batch_size))
+
+        results, items = [], []
+        all_results = [self._new_result(idx, url) for idx, url in enumerate(urls)]
+        pending = set(self.pmc_db.pending_pmcids([r["pmcid"] for r in all_results if r["pmcid"]], max_age=max_age)) \
+            if resume else None
+        seen = set()
+        for result in all_results:
+            if result["pmcid"] is None:
+                results.append(result)
+            elif result["pmcid"] in seen:
+                # the CSV lists some articles more than once; ingest each PMCID once per run
+                result["ok"] = result["skipped"] = True
+                results.append(result)
+            elif pending is not None and result["pmcid"] not in pending:
+                result["ok"] = result["skipped"] = True
+                results.append(result)
+            else:
+                items.append(result)
+            if result["pmcid"] is not None:
+                seen.add(result["pmcid"])
+        if resume:
+            print(f"[DEBUG] Resuming: {len(items)} to fetch, {sum(r['skipped'] for r in results)} already done")
+
+        PMCMetadataFetcher.RATE_LIMITER = RateLimiter(requests_per_second)
+        PMCMetadataFetcher.CACHE = self.cache
+        if workers > 1:
+            PMCMetadataFetcher.SESSION = make_session(pool_size=workers * 2)
+
         start_time = time.time()
-        for idx, url in enumerate(urls):
-            try:
-                pmcid = re.search(r"(PMC\d+)", str(url)).group(1)
-                self.pmc_db.insert_article(pmcid, enable_auto_keyword_generation=True)
-                print(f"[DEBUG] {idx+1}/{len(urls)} Processed {pmcid}")
-            except Exception as e:
-                msg = f"[ERROR] Line {idx+1}, URL: {url}, ERROR: {e}"
-                total_errors += msg + "\n"
-                print(msg)
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = [executor.submit(self._ingest_batch, items[i:i + batch_size])
+                           for i in range(0, len(items), batch_size)]
+                for future in as_completed(futures):
+                    for result in future.result():
+                        results.append(result)
+                        if result["ok"]:
+                            print(f"[DEBUG] {len(results)}/{len(urls)} Processed {result['pmcid']} ({result['elapsed']:.2f} sec)")
+                        else:
+                            print(f"[ERROR] Line {result['line']}, URL: {result['url']}, ERROR: {result['error']}")
+        finally:
+            PMCMetadataFetcher.RATE_LIMITER = None
+            PMCMetadataFetcher.CACHE = None
+
+        results.sort(key=lambda r: r["line"])
         elapsed = time.time() - start_time
-        print(f"[DEBUG] Total elapsed time: {elapsed:.2f} sec")
-        if total_errors:
-            print("[DEBUG] Errors during processing:\n", total_errors)
+        errors = [r for r in results if not r["ok"]]
+        skipped = sum(1 for r in results if r["skipped"])
+        print(f"[DEBUG] Total elapsed time: {elapsed:.2f} sec, {len(results) - len(errors) - skipped} ok, "
+              f"{skipped} skipped, {len(errors)} failed")
+        if errors:
+            print("[DEBUG] Errors during processing:")
+            for r in errors:
+                print(f"  Line {r['line']}, URL: {r['url']}, ERROR: {r['error']}")
+        self.update_embeddings()
+        return results
 
-    def run(self):
+    def update_embeddings(self) -> bool:
+        """Re-embed articles whose text changed since the last run; the rest are reused from disk."""
+        from corpus_index import EmbeddingIndex
+        try:
+            return EmbeddingIndex.build(self.db_file, self.pmc_db.fetch_filtered(), encode_texts,
+                                        SENTENCE_MODEL_NAME) is not None
+        except Exception as e:
+            print(f"[ERROR] Embedding index not updated: {e}")
+            return False
+
+    def run(self, workers: int = 1, requests_per_second: float = NCBI_REQUESTS_PER_SECOND, batch_size: int = 1,
+            resume: bool = True, max_age: Optional[float] = None) -> List[dict]:
         if self.download_csv():
-            self.process_articles()
+            return self.process_articles(workers=workers, requests_per_second=requests_per_second, batch_size=batch_size,
+                                         resume=resume, max_age=max_age)
         else:
             print("[ERROR] CSV download failed. Exiting.")
             raise SystemExit(1)
 
+    def reparse_from_cache(self, workers: int = 1, batch_size: int = EFETCH_BATCH_SIZE) -> List[dict]:
+        """Rebuild every article from the HTTP cache only, e.g. after a parser or schema change."""
+        if self.cache is None:
+            raise ValueError("reparse_from_cache needs a pipeline created with cache_dir")
+        self.cache.offline = True
+        try:
+            return self.process_articles(workers=workers, requests_per_second=0, batch_size=batch_size, resume=False)
+        finally:
+            self.cache.offline = False
+
 
 if __name__ == "__main__":
     DB_FILE = "pmc_articles_csv_metadata.db"
     CSV_FILE = "SB_publication_PMC.csv"
     CSV_URL = "https://raw.githubusercontent.com/jgalazka/SB_publications/refs/heads/main/SB_publication_PMC.csv"
+    CACHE_DIR = "http_cache"
 
-    # pipeline = PMCPipeline(DB_FILE, CSV_FILE, CSV_URL)
-    # pipeline.run()
+    # pipeline = PMCPipeline(DB_FILE, CSV_FILE, CSV_URL, cache_dir=CACHE_DIR)
+    # pipeline.run(workers=8, requests_per_second=NCBI_REQUESTS_PER_SECOND, batch_size=EFETCH_BATCH_SIZE)
+    # pipeline.reparse_from_cache(workers=8)
+    # pipeline.update_embeddings()
 
     db = PMCDatabase(DB_FILE)
     db.print_json(db.fetch_filtered(title='Hindlimb suspension in Wistar rats: Sex‐based differences in muscle response'))
@@ -88,62 +88,76 @@
     }
 
     async function fetchChartsPayload() {
-        const res = await fetch('/api/charts', { method: 'POST', headers: { 'Content-Type': 'application/json' }, body: JSON.stringify({}) });
+        // GET + ETag: the browser revalidates with If-None-Match and reuses its copy on 304
+        const res = await fetch('/api/charts');
         if (!res.ok) throw new Error('Failed to fetch charts payload');
         return await res.json();
     }
 
-    function showArticlesModal(title, articles) {
-        const [label, value] = title.split(':');
-        modalTitle.innerHTML = `<span class="modal-label">${label}:</span> <span class="modal-value">${value.trim()}</span>`;
+    async function fetchChartArticles(filterType, value, page) {
+        const params = new URLSearchParams({ filter: filterType, value, page });
+        const res = await fetch(`/api/charts/articles?${params}`);
+        if (!res.ok) throw new Error('Failed to fetch chart articles');
+        return await res.json();
+    }
+
+    function appendArticleCards(articles) {
+        articles.forEach(a => {
+            const card = document.createElement('div');
+            card.className = 'article-card';
+            card.innerHTML = `<a href="https://www.ncbi.nlm.nih.gov/pmc/articles/${a.Pmcid}/" target="_blank">${a.Title}</a><p>${a.Authors || 'Unknown authors'}</p>`;
+            modalArticles.appendChild(card);
+        });
+    }
+
+    async function showArticlesModal(filterType, value) {
+        const label = filterType.charAt(0).toUpperCase() + filterType.slice(1);
+        modalTitle.innerHTML = `<span class="modal-label">${label}:</span> <span class="modal-value">${String(value).trim()}</span>`;
+        modalArticles.innerHTML = '<p>Loading…</p>';
+        modal.style.display = 'flex';
+        document.body.style.overflow = 'hidden';
 
+        let page = 1;
+        let data = await fetchChartArticles(filterType, value, page);
         modalArticles.innerHTML = '';
-        if (!articles.length) modalArticles.innerHTML = '<p>No articles found.</p>';
-        else {
-            articles.forEach(a => {
-                const card = document.createElement('div');
-                card.className = 'article-card';
-                card.innerHTML = `<a href="https://www.ncbi.nlm.nih.gov/pmc/articles/${a.Pmcid}/" target="_blank">${a.Title}</a><p>${a.Authors || 'Unknown authors'}</p>`;
-                modalArticles.appendChild(card);
+        if (!data.articles.length) {
+            modalArticles.innerHTML = '<p>No articles found.</p>';
+            return;
+        }
+        appendArticleCards(data.articles);
+
+        // the drill-down is paged server-side; fetch the next page on demand
+        if (page * data.per_page < data.total) {
+            const more = document.createElement('button');
+            more.className = 'download-btn';
+            more.textContent = 'Load more';
+            more.addEventListener('click', async () => {
+                more.disabled = true;
+                page += 1;
+                data = await fetchChartArticles(filterType, value, page);
+                more.remove();
+                appendArticleCards(data.articles);
+                if (page * data.per_page < data.total) {
+                    more.disabled = false;
+                    modalArticles.appendChild(more);
+                }
             });
+            modalArticles.appendChild(more);
         }
-        modal.style.display = 'flex';
-        document.body.style.overflow = 'hidden';
     }
 
-    function addDrilldown(chart, filterType, labels, articles) {
+    function addDrilldown(chart, filterType, labels) {
         chart.options.onClick = (evt) => {
             const points = chart.getElementsAtEventForMode(evt, 'nearest', { intersect: true }, true);
             if (!points.length) return;
-            const idx = points[0].index;
-            const value = labels[idx];
-            const filtered = articles.filter(a => {
-                if (filterType === 'year') return a.PublicationDate && a.PublicationDate.startsWith(String(value));
-                if (filterType === 'category') {
-                    if (!a.Keywords) return false;
-                    const kws = Array.isArray(a.Keywords) ? a.Keywords.map(k => k.toLowerCase()) : a.Keywords.split(',').map(k => k.trim().toLowerCase());
-                    return kws.includes(value.toLowerCase());
-                }
-                if (filterType === 'author') {
-                    if (!a.Authors) return false;
-                    const auths = Array.isArray(a.Authors) ? a.Authors.map(a => a.toLowerCase()) : a.Authors.split(',').map(a => a.trim().toLowerCase());
-                    return auths.includes(value.toLowerCase());
-                }
-                if (filterType === 'publisher') {
-                    if (!a.Publisher) return false;
-                    const pubs = typeof a.Publisher === 'string' ? a.Publisher.split(',').map(p => p.trim().toLowerCase()) : a.Publisher.map(p => p.toLowerCase());
-                    return pubs.some(p => p.includes(value.toLowerCase()));
-                }
-                return true;
-            });
-            showArticlesModal(`${filterType.charAt(0).toUpperCase() + filterType.slice(1)}: ${value}`, filtered);
+            showArticlesModal(filterType, labels[points[0].index]).catch(err => console.error('drill-down error:', err));
         };
         chart.update();
     }
 
-    function renderAndBind({ canvasId, type, labels, counts, filterType, articles, horizontal = false }) {
+    function renderAndBind({ canvasId, type, labels, counts, filterType, horizontal = false }) {
         const chart = renderGenericChart({ canvasId, type, labels, counts, horizontal });
-        addDrilldown(chart, filterType, labels, articles);
+        addDrilldown(chart, filterType, labels);
         return chart;
     }
 
@@ -162,7 +176,6 @@
 
     try {
         const payload = await fetchChartsPayload();
-        const articlesData = payload.articles || [];
 
         const yearLabels = (payload.years || []).map(r => String(r.year));
         const yearCounts = (payload.years || []).map(r => Number(r.count || 0));
@@ -173,25 +186,25 @@
         const publisherLabels = (payload.publishers || []).map(r => r.publisher);
         const publisherCounts = (payload.publishers || []).map(r => Number(r.count || 0));
 
-        articlesChartInstance = renderAndBind({ canvasId: 'articlesChart', type: 'bar', labels: yearLabels, counts: yearCounts, filterType: 'year', articles: articlesData });
-        categoryChartInstance = renderAndBind({ canvasId: 'categoryChart', type: 'bar', labels: categoryLabels, counts: categoryCounts, filterType: 'category', articles: articlesData });
-        authorChartInstance = renderAndBind({ canvasId: 'authorChart', type: 'bar', labels: authorLabels, counts: authorCounts, filterType: 'author', articles: articlesData, horizontal: true });
-        publisherChartInstance = renderAndBind({ canvasId: 'publisherChart', type: 'pie', labels: publisherLabels, counts: publisherCounts, filterType: 'publisher', articles: articlesData });
+        articlesChartInstance = renderAndBind({ canvasId: 'articlesChart', type: 'bar', labels: yearLabels, counts: yearCounts, filterType: 'year' });
+        categoryChartInstance = renderAndBind({ canvasId: 'categoryChart', type: 'bar', labels: categoryLabels, counts: categoryCounts, filterType: 'category' });
+        authorChartInstance = renderAndBind({ canvasId: 'authorChart', type: 'bar', labels: authorLabels, counts: authorCounts, filterType: 'author', horizontal: true });
+        publisherChartInstance = renderAndBind({ canvasId: 'publisherChart', type: 'pie', labels: publisherLabels, counts: publisherCounts, filterType: 'publisher' });
 
         document.getElementById('chartType').addEventListener('change', (e) => {
-            articlesChartInstance = renderAndBind({ canvasId: 'articlesChart', type: e.target.value, labels: yearLabels, counts: yearCounts, filterType: 'year', articles: articlesData });
+            articlesChartInstance = renderAndBind({ canvasId: 'articlesChart', type: e.target.value, labels: yearLabels, counts: yearCounts, filterType: 'year' });
         });
         document.getElementById('chartType2').addEventListener('change', (e) => {
-            categoryChartInstance = renderAndBind({ canvasId: 'categoryChart', type: e.target.value, labels: categoryLabels, counts: categoryCounts, filterType: 'category', articles: articlesData });
+            categoryChartInstance = renderAndBind({ canvasId: 'categoryChart', type: e.target.value, labels: categoryLabels, counts: categoryCounts, filterType: 'category' });
         });
         document.getElementById('chartType3').addEventListener('change', (e) => {
             const horizontal = e.target.value === 'horizontal';
-            authorChartInstance = renderAndBind({ canvasId: 'authorChart', type: horizontal ? 'bar' : e.target.value, labels: authorLabels, counts: authorCounts, filterType: 'author', articles: articlesData, horizontal });
+            authorChartInstance = renderAndBind({ canvasId: 'authorChart', type: horizontal ? 'bar' : e.target.value, labels: authorLabels, counts: authorCounts, filterType: 'author', horizontal });
         });
         document.getElementById('chartType4').addEventListener('change', (e) => {
             const horizontal = e.target.value === 'horizontal';
             const type = horizontal ? 'bar' : e.target.value;
-            publisherChartInstance = renderAndBind({ canvasId: 'publisherChart', type, labels: publisherLabels, counts: publisherCounts, filterType: 'publisher', articles: articlesData, horizontal });
+            publisherChartInstance = renderAndBind({ canvasId: 'publisherChart', type, labels: publisherLabels, counts: publisherCounts, filterType: 'publisher', horizontal });
         });
 
         addDownloadListener('downloadArticlesChart', 'articlesChart', 'articles_chart.png');
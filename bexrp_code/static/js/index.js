@@ -2,6 +2,7 @@ let currentPage = 1;
 let totalArticles = 0;
 let isFetching = false;
 let currentSort = "best"; // persists the user's selected sort for all requests
+let currentSearchMode = "keyword"; // keyword (full text), semantic (embeddings) or hybrid
 const filterBtn = document.getElementById("filter-btn");
 const filterPanel = document.getElementById("filterPanel");
 const clearBtn = document.querySelector(".clear-filters-btn");
@@ -671,6 +672,46 @@ function downloadNbib(pmcid) {
         });
 }
 
+// Streams /api/summary/stream over SSE; onToken gets the text so far, resolves with the full summary.
+function streamSummary(params, onToken) {
+    return new Promise((resolve, reject) => {
+        const source = new EventSource(
+            "/api/summary/stream?" + new URLSearchParams(params)
+        );
+        let text = "";
+        source.addEventListener("token", (ev) => {
+            text += JSON.parse(ev.data).text;
+            if (onToken) onToken(text);
+        });
+        source.addEventListener("done", (ev) => {
+            source.close();
+            resolve(JSON.parse(ev.data).summary || text);
+        });
+        source.addEventListener("failure", (ev) => {
+            source.close();
+            const err = new Error(JSON.parse(ev.data).summary);
+            err.serverMessage = err.message; // e.g. "Unable to summarize.", shown as is
+            reject(err);
+        });
+        source.onerror = () => {
+            source.close();
+            reject(new Error("Summary stream failed"));
+        };
+    });
+}
+
+async function fetchArticleDetail(id, fields) {
+    const params = fields ? `?fields=${encodeURIComponent(fields.join(","))}` : "";
+    try {
+        const res = await fetch(`/api/article/${encodeURIComponent(id)}${params}`);
+        if (!res.ok) throw new Error(`HTTP ${res.status}`);
+        return await res.json();
+    } catch (err) {
+        console.error("article detail error:", err);
+        return null;
+    }
+}
+
 async function showSummaryFromElem(elem) {
     const idRaw = elem.dataset.id;
     const id = isNaN(Number(idRaw)) ? idRaw : Number(idRaw);
@@ -692,6 +733,12 @@ async function showSummaryFromElem(elem) {
     } catch {
         images = [];
     }
+    // result cards are a lean projection: the full image list comes from the detail endpoint
+    if (elem.dataset.images === undefined && elem.dataset.id) {
+        const detail = await fetchArticleDetail(elem.dataset.id, ["Images"]);
+        images = (detail && detail.Images) || [];
+        elem.dataset.images = JSON.stringify(images);
+    }
     if ((!images || images.length === 0) && elem.dataset.image) {
         images = [elem.dataset.image];
     }
@@ -940,16 +987,13 @@ async function showSummaryFromElem(elem) {
     openModal("summary-modal");
 
     try {
-        const res = await fetch("/api/summary", {
-            method: "POST",
-            headers: { "Content-Type": "application/json" },
-            body: JSON.stringify({ pub_id: id }),
+        const summary = await streamSummary({ pub_id: id }, (partial) => {
+            if (summaryDiv) summaryDiv.innerText = partial;
         });
-        const data = await res.json();
         if (summaryDiv)
-            summaryDiv.innerHTML = data.summary || "No summary available.";
+            summaryDiv.innerText = summary || "No summary available.";
     } catch (err) {
-        if (summaryDiv) summaryDiv.innerHTML = "Error fetching summary.";
+        if (summaryDiv) summaryDiv.innerText = err.serverMessage || "Error fetching summary.";
         console.error(err);
     }
 }
@@ -994,6 +1038,9 @@ async function fetchArticles(reset = false) {
         if (currentSort && currentSort !== "best") {
             payload.sort = currentSort;
         }
+        if (currentSearchMode && currentSearchMode !== "keyword") {
+            payload.mode = currentSearchMode;
+        }
 
         const res = await fetch("/api/advancedf", {
             method: "POST",
@@ -1055,16 +1102,14 @@ async function fetchArticles(reset = false) {
             } catch {
                 a.dataset.keywords = "[]";
             }
-            try {
-                a.dataset.images = JSON.stringify(
-                    pub.Images && pub.Images.length
-                        ? pub.Images
-                        : pub.Image
-                            ? [pub.Image]
-                            : []
-                );
-            } catch {
-                a.dataset.images = "[]";
+            if (pub.Images) {
+                try {
+                    a.dataset.images = JSON.stringify(
+                        pub.Images.length ? pub.Images : pub.Image ? [pub.Image] : []
+                    );
+                } catch {
+                    a.dataset.images = "[]";
+                }
             }
             a.addEventListener("click", function(e) {
                 e.preventDefault();
@@ -1179,6 +1224,15 @@ document.addEventListener("DOMContentLoaded", () => {
         });
     }
 
+    const modeSelect = document.getElementById("search-mode");
+    if (modeSelect) {
+        currentSearchMode = modeSelect.value || "keyword";
+        modeSelect.addEventListener("change", (e) => {
+            currentSearchMode = e.target.value || "keyword";
+            fetchArticles(true);
+        });
+    }
+
     const searchForm = document.querySelector(".search-box");
     if (searchForm) {
         searchForm.onsubmit = (e) => {
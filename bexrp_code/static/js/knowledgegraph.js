@@ -137,41 +137,64 @@ document.addEventListener('DOMContentLoaded', () => {
         return selected.length ? selected : text.slice(0, 400) + (text.length > 400 ? '…' : '');
     }
 
-    async function fetchAiSummary(pubId, meta) {
+    // Streams /api/summary/stream over SSE; onToken gets the text so far, resolves with the full summary.
+    function streamSummary(params, onToken) {
+        return new Promise((resolve, reject) => {
+            const source = new EventSource('/api/summary/stream?' + new URLSearchParams(params));
+            let text = '';
+            source.addEventListener('token', (ev) => {
+                text += JSON.parse(ev.data).text;
+                if (onToken) onToken(text);
+            });
+            source.addEventListener('done', (ev) => {
+                source.close();
+                resolve(JSON.parse(ev.data).summary || text);
+            });
+            source.addEventListener('failure', (ev) => {
+                source.close();
+                reject(new Error(JSON.parse(ev.data).summary));
+            });
+            source.onerror = () => {
+                source.close();
+                reject(new Error('Summary stream failed'));
+            };
+        });
+    }
+
+    async function fetchAiSummary(pubId, meta, onToken) {
         const title = (meta && (meta.Title || meta.title_full || meta.title || '')).trim();
 
         if (title) {
             try {
-                const res = await fetch('/api/summary', {
-                    method: 'POST',
-                    headers: { 'Content-Type': 'application/json' },
-                    body: JSON.stringify({ title: title })
-                });
-                const data = await res.json().catch(() => ({}));
-                if (res.ok && data && data.summary) return data.summary;
-                console.warn('Backend summary by title failed or empty, falling back:', data);
+                const summary = await streamSummary({ title: title }, onToken);
+                if (summary) return summary;
+                console.warn('Backend summary by title was empty, falling back.');
             } catch (err) {
-                console.warn('Error calling backend /api/summary with title — falling back to pub_id/local summary.', err);
+                console.warn('Error streaming /api/summary/stream with title — falling back to pub_id/local summary.', err);
             }
         }
 
         if (typeof pubId === 'number') {
             try {
-                const res = await fetch('/api/summary', {
-                    method: 'POST',
-                    headers: { 'Content-Type': 'application/json' },
-                    body: JSON.stringify({ pub_id: pubId })
-                });
-                const data = await res.json().catch(() => ({}));
-                if (res.ok && data && data.summary) return data.summary;
-                console.warn('Backend summary by pub_id failed or empty, falling back:', data);
+                const summary = await streamSummary({ pub_id: pubId }, onToken);
+                if (summary) return summary;
+                console.warn('Backend summary by pub_id was empty, falling back.');
             } catch (err) {
-                console.warn('Error calling backend /api/summary with pub_id — falling back to local summary.', err);
+                console.warn('Error streaming /api/summary/stream with pub_id — falling back to local summary.', err);
             }
         } else {
             console.info('No numeric pubId available — attempting local fallback summary.');
         }
 
+        // graph nodes don't carry the article text; fetch it for the local fallback
+        if (typeof pubId === 'number' && !meta.Abstract && !meta.Sections) {
+            try {
+                const res = await fetch(`/api/article/${pubId}?fields=Abstract,Sections`);
+                if (res.ok) meta = { ...meta, ...(await res.json()) };
+            } catch (err) {
+                console.warn('Error fetching article text for the local summary.', err);
+            }
+        }
         return localFallbackSummary(meta, 3);
     }
 
@@ -213,7 +236,11 @@ document.addEventListener('DOMContentLoaded', () => {
         }
 
         try {
-            const summary = await fetchAiSummary(pubId, meta || {});
+            const summary = await fetchAiSummary(pubId, meta || {}, (partial) => {
+                if (!detailAiSummary) return;
+                detailAiSummary.innerText = partial;
+                detailAiSummary.style.display = 'block';
+            });
             if (meta) meta._ai_summary = summary;
             renderAiSummary(summary);
         } catch (err) {
@@ -970,6 +997,13 @@ document.addEventListener('DOMContentLoaded', () => {
         }, 120);
     });
 
+    // start from the most central part of the graph (precomputed server side) instead of an empty canvas
+    postKG({ central: 'all' })
+        .then((payload) => {
+            if (!network && payload && payload.nodes && payload.nodes.length) renderGraphPayload(payload);
+        })
+        .catch((err) => console.warn('Central graph unavailable', err));
+
     window.postKG = postKG;
     window.renderGraphPayload = renderGraphPayload;
     window.showDetailWindow = showDetailWindow;
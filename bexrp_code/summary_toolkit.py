@@ -0,0 +1,493 @@
+#!/usr/bin/env python3
+"""Summary generation helpers shared by app.py and offline jobs."""
+
+import os
+import time
+import hashlib
+import argparse
+import queue
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Iterator, List, NamedTuple, Optional, Tuple
+
+from pmc_toolkit import PMCDatabase
+
+SUMMARY_MODEL = "sshleifer/distilbart-cnn-12-6"
+SUMMARY_MIN_LEN = 50
+SUMMARY_MAX_LEN = 120
+# "torch": fp32 PyTorch, "int8": dynamically quantized PyTorch Linear layers,
+# "onnx": ONNX Runtime export via optimum (exported once into ONNX_EXPORT_DIR)
+SUMMARY_BACKENDS = ("torch", "int8", "onnx")
+ONNX_EXPORT_DIR = "onnx_models"
+# inputs over the model's token limit: "truncate" keeps the head, "chunk" map-reduces up to
+# SUMMARY_MAX_CHUNKS windows (and truncates beyond that, so latency stays bounded)
+SUMMARY_LONG_INPUTS = "chunk"
+SUMMARY_MAX_CHUNKS = 4
+
+
+def pick_summary_text(record: dict) -> Optional[str]:
+    """The abstract, or the shortest non-empty section when there is no abstract."""
+    if not record:
+        return None
+    abstract = record.get('abstract') or record.get('Abstract') or ""
+    if abstract and isinstance(abstract, str) and abstract.strip():
+        return abstract.strip()
+    sections = record.get('sections') or record.get('Sections')
+    if sections and isinstance(sections, dict):
+        paragraphs = [t for t in sections.values() if isinstance(t, str) and t.strip()]
+        if paragraphs:
+            paragraphs.sort(key=len)
+            return paragraphs[0].strip()
+    return None
+
+
+def summary_lengths(n_tokens: int, min_len: int = SUMMARY_MIN_LEN, max_len: int = SUMMARY_MAX_LEN) -> Tuple[int, int]:
+    """Generation (min_length, max_length) for an input of `n_tokens` model tokens."""
+    DMAXLEN = min(n_tokens, max_len)
+    DMINLEN = max(int(DMAXLEN * 0.5), min_len) + 5
+    DMINLEN = min(DMINLEN, DMAXLEN)
+    return DMINLEN, DMAXLEN
+
+
+class SummaryPlan(NamedTuple):
+    # (text, min_length, max_length) per forward pass of the map step
+    chunks: List[Tuple[str, int, int]]
+    # generation lengths of the final summary; with several chunks, of the reduce step
+    min_length: int
+    max_length: int
+    input_tokens: int
+    strategy: str  # "single", "truncate" or "map_reduce"
+
+
+class SummaryPlanner:
+    """
+    Plans a summary from real token counts: generation lengths come from the tokenized
+    input, and inputs over the model limit are truncated or split into balanced windows
+    whose summaries are summarized again (map-reduce).
+    """
+
+    def __init__(self, tokenizer, min_len: int = SUMMARY_MIN_LEN, max_len: int = SUMMARY_MAX_LEN,
+                 long_inputs: str = SUMMARY_LONG_INPUTS, max_chunks: int = SUMMARY_MAX_CHUNKS,
+                 max_input_tokens: Optional[int] = None):
+        if long_inputs not in ("truncate", "chunk"):
+            raise ValueError(f"Unknown long input strategy {long_inputs!r}, expected 'truncate' or 'chunk'")
+        self.tokenizer = tokenizer
+        self.min_len = min_len
+        self.max_len = max_len
+        self.long_inputs = long_inputs
+        self.max_chunks = max(1, max_chunks)
+        if max_input_tokens is None:
+            # model_max_length is a huge sentinel for tokenizers without a limit
+            model_limit = tokenizer.model_max_length if tokenizer.model_max_length < 100_000 else 1024
+            max_input_tokens = model_limit - tokenizer.num_special_tokens_to_add()
+        self.max_input_tokens = max_input_tokens
+
+    @classmethod
+    def from_pretrained(cls, model: str = SUMMARY_MODEL, **kwargs) -> "SummaryPlanner":
+        from transformers import AutoTokenizer
+        return cls(AutoTokenizer.from_pretrained(model), **kwargs)
+
+    def _decode(self, ids: List[int]) -> str:
+        return self.tokenizer.decode(ids, skip_special_tokens=True, clean_up_tokenization_spaces=True).strip()
+
+    def plan(self, text: str) -> SummaryPlan:
+        ids = self.tokenizer(text, add_special_tokens=False)["input_ids"]
+        limit = self.max_input_tokens
+        min_length, max_length = summary_lengths(len(ids), self.min_len, self.max_len)
+        if len(ids) <= limit:
+            return SummaryPlan([(text, min_length, max_length)], min_length, max_length, len(ids), "single")
+
+        n_chunks = -(-len(ids) // limit) if self.long_inputs == "chunk" else 1
+        if n_chunks > self.max_chunks:
+            ids = ids[:self.max_chunks * limit]
+            n_chunks = self.max_chunks
+        if n_chunks == 1:
+            return SummaryPlan([(self._decode(ids[:limit]), min_length, max_length)], min_length, max_length,
+                               len(ids), "truncate")
+
+        size = -(-len(ids) // n_chunks)
+        chunks = []
+        for start in range(0, len(ids), size):
+            window = ids[start:start + size]
+            chunks.append((self._decode(window), *summary_lengths(len(window), self.min_len, self.max_len)))
+        return SummaryPlan(chunks, min_length, max_length, len(ids), "map_reduce")
+
+
+def summarize_plan(plan: SummaryPlan, summarize_many) -> str:
+    """
+    Runs a plan. `summarize_many` takes a list of (text, min_length, max_length) and returns
+    their summaries, so callers decide how the map step is batched.
+    """
+    summaries = summarize_many(plan.chunks)
+    if len(summaries) == 1:
+        return summaries[0]
+    return summarize_many([(" ".join(summaries), plan.min_length, plan.max_length)])[0]
+
+
+def summary_model_key(model: str, backend: str = "torch", decoding: str = "beam") -> str:
+    """
+    Model name stored with cached summaries; non-default backends and greedy (streamed)
+    decoding get their own entries, so a cached summary always comes from the same settings.
+    """
+    key = model if backend == "torch" else f"{model}+{backend}"
+    return key if decoding == "beam" else f"{key}+{decoding}"
+
+
+def _load_onnx_pipeline(model: str):
+    try:
+        from optimum.onnxruntime import ORTModelForSeq2SeqLM
+    except ImportError as e:
+        raise ImportError("the onnx backend needs optimum[onnxruntime] (pip install 'optimum[onnxruntime]')") from e
+    from transformers import AutoTokenizer, pipeline
+
+    export_dir = os.path.join(ONNX_EXPORT_DIR, model.replace("/", "--"))
+    if os.path.isdir(export_dir):
+        ort_model = ORTModelForSeq2SeqLM.from_pretrained(export_dir)
+        tokenizer = AutoTokenizer.from_pretrained(export_dir)
+    else:
+        print(f"[DEBUG] Exporting {model} to ONNX in {export_dir}")
+        ort_model = ORTModelForSeq2SeqLM.from_pretrained(model, export=True)
+        tokenizer = AutoTokenizer.from_pretrained(model)
+        ort_model.save_pretrained(export_dir)
+        tokenizer.save_pretrained(export_dir)
+    return pipeline('summarization', model=ort_model, tokenizer=tokenizer)
+
+
+def load_summarization_pipeline(model: str = SUMMARY_MODEL, device: Optional[int] = None, backend: str = "torch"):
+    # transformers/torch are imported here so importing this module stays cheap
+    if backend not in SUMMARY_BACKENDS:
+        raise ValueError(f"Unknown summary backend {backend!r}, expected one of {SUMMARY_BACKENDS}")
+    if backend == "onnx":
+        return _load_onnx_pipeline(model)
+
+    from transformers import pipeline
+    if device is None:
+        summarizer = pipeline('summarization', model=model)
+    else:
+        summarizer = pipeline('summarization', model=model, device=device)
+    if backend == "int8":
+        import torch
+        summarizer.model = torch.ao.quantization.quantize_dynamic(summarizer.model, {torch.nn.Linear}, dtype=torch.qint8)
+    return summarizer
+
+
+def run_summarizer(summarizer, texts: List[str], min_length: int, max_length: int) -> List[str]:
+    """One forward pass of the transformers pipeline over `texts`."""
+    import torch
+    with torch.inference_mode():
+        outputs = summarizer(texts, min_length=min_length, max_length=max_length, do_sample=False,
+                             truncation=True, batch_size=len(texts))
+    return [o['summary_text'] for o in outputs]
+
+
+def stream_summary(summarizer, text: str, min_length: int, max_length: int, timeout: float = 120.0) -> Iterator[str]:
+    """
+    Yields pieces of the summary of `text` as generate() produces them, via TextIteratorStreamer.
+    Streamers need a single greedy sequence, so this decodes with num_beams=1 instead of the
+    model's default beam search. Closing the generator early (client gone) stops generate().
+    """
+    import torch
+    from transformers import StoppingCriteria, StoppingCriteriaList, TextIteratorStreamer
+
+    tokenizer, model = summarizer.tokenizer, summarizer.model
+    inputs = tokenizer(text, return_tensors="pt", truncation=True)
+    streamer = TextIteratorStreamer(tokenizer, skip_special_tokens=True, timeout=timeout)
+    cancelled = threading.Event()
+    errors = []
+
+    class Cancelled(StoppingCriteria):
+        def __call__(self, input_ids, scores, **kwargs):
+            return torch.full((input_ids.shape[0],), cancelled.is_set(), dtype=torch.bool, device=input_ids.device)
+
+    def generate():
+        try:
+            with torch.inference_mode():
+                model.generate(**inputs, streamer=streamer, min_length=min_length, max_length=max_length,
+                               num_beams=1, do_sample=False, stopping_criteria=StoppingCriteriaList([Cancelled()]))
+        except Exception as e:
+            errors.append(e)
+            streamer.end()
+
+    thread = threading.Thread(target=generate, name="summary-stream", daemon=True)
+    thread.start()
+    try:
+        for piece in streamer:
+            if piece:
+                yield piece
+    finally:
+        # GeneratorExit on disconnect, or a streamer timeout: let the generation thread finish early
+        cancelled.set()
+    thread.join()
+    if errors:
+        raise errors[0]
+
+
+class SummaryCache:
+    """
+    Generated summaries keyed by (pmcid, source-text hash, model, min/max length):
+    an in-process LRU in front of the summaries table in the articles DB.
+    A changed abstract or model produces a new key, so stale summaries never match.
+    """
+
+    def __init__(self, db: PMCDatabase, capacity: int = 1024):
+        self.db = db
+        self.capacity = capacity
+        self._lru: "OrderedDict[tuple, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def text_hash(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def _remember(self, key: tuple, summary: str):
+        with self._lock:
+            self._lru[key] = summary
+            self._lru.move_to_end(key)
+            while len(self._lru) > self.capacity:
+                self._lru.popitem(last=False)
+
+    def get(self, pmcid: str, text: str, model: str, min_length: int, max_length: int) -> Optional[str]:
+        key = (pmcid, self.text_hash(text), model, min_length, max_length)
+        with self._lock:
+            summary = self._lru.get(key)
+            if summary is not None:
+                self._lru.move_to_end(key)
+                return summary
+        summary = self.db.fetch_summary(*key)
+        if summary is not None:
+            self._remember(key, summary)
+        return summary
+
+    def put(self, pmcid: str, text: str, model: str, min_length: int, max_length: int, summary: str):
+        key = (pmcid, self.text_hash(text), model, min_length, max_length)
+        self.db.store_summary(*key, summary)
+        self._remember(key, summary)
+
+
+class SummaryBatcher:
+    """
+    Micro-batching front for a shared summarizer. Request threads submit texts to a queue;
+    one worker thread drains up to `max_batch_size` of them, waiting at most `max_wait`
+    seconds after the first, runs each (min_length, max_length) group in one forward pass
+    and resolves the callers' futures. Identical concurrent requests are summarized once.
+    Callers wait at most `timeout` seconds (None: forever) for their results.
+    """
+
+    def __init__(self, summarizer, max_batch_size: int = 8, max_wait: float = 0.02, timeout: Optional[float] = 300.0):
+        self.summarizer = summarizer
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait
+        self.timeout = timeout
+        self._queue: "queue.Queue[tuple]" = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="summary-batcher", daemon=True)
+                self._worker.start()
+
+    def submit(self, text: str, min_length: int, max_length: int) -> Future:
+        future: Future = Future()
+        self._ensure_worker()
+        self._queue.put((text, min_length, max_length, future))
+        return future
+
+    def summarize(self, text: str, min_length: int, max_length: int) -> str:
+        return self.submit(text, min_length, max_length).result(self.timeout)
+
+    def summarize_many(self, items: List[Tuple[str, int, int]]) -> List[str]:
+        # submitted together so the chunks of one long input share micro-batches
+        futures = [self.submit(*item) for item in items]
+        if self.timeout is None:
+            return [future.result() for future in futures]
+        deadline = time.monotonic() + self.timeout
+        return [future.result(max(0.0, deadline - time.monotonic())) for future in futures]
+
+    def _next_batch(self) -> List[tuple]:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run_group(self, min_length: int, max_length: int, waiters: "OrderedDict[str, List[Future]]"):
+        texts = list(waiters)
+        try:
+            summaries = run_summarizer(self.summarizer, texts, min_length, max_length)
+        except Exception as e:
+            if len(texts) == 1:
+                for future in waiters[texts[0]]:
+                    future.set_exception(e)
+                return
+            print(f"[ERROR] Summary batch of {len(texts)} failed ({e}), retrying one by one")
+            for text in texts:
+                self._run_group(min_length, max_length, OrderedDict([(text, waiters[text])]))
+            return
+        for text, summary in zip(texts, summaries):
+            for future in waiters[text]:
+                future.set_result(summary)
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            # generation lengths are per call, so one forward pass per (min, max) group
+            groups = {}
+            for text, min_length, max_length, future in batch:
+                if not future.set_running_or_notify_cancel():
+                    continue
+                groups.setdefault((min_length, max_length), OrderedDict()).setdefault(text, []).append(future)
+            for (min_length, max_length), waiters in groups.items():
+                start_time = time.time()
+                try:
+                    self._run_group(min_length, max_length, waiters)
+                except Exception as e:
+                    # never leave a caller waiting on a future the worker gave up on
+                    print(f"[ERROR] Summary batch of {len(waiters)} text(s) failed: {e}")
+                    for future in (f for futures in waiters.values() for f in futures):
+                        if not future.done():
+                            future.set_exception(e)
+                    continue
+                print(f"[DEBUG] Summary batch: {len(waiters)} text(s) in {time.time() - start_time:.2f} sec")
+
+
+class SummaryPipeline:
+    """
+    Offline job that pre-summarizes every article in the DB into the summaries table,
+    so /api/summary only has to look results up. Articles already cached for the current
+    text/model/lengths are skipped, which makes the job resumable.
+    """
+
+    def __init__(self, db_file: str, model: str = SUMMARY_MODEL, min_len: int = SUMMARY_MIN_LEN,
+                 max_len: int = SUMMARY_MAX_LEN, batch_size: int = 8, num_threads: Optional[int] = None,
+                 backend: str = "torch", long_inputs: str = SUMMARY_LONG_INPUTS):
+        self.db = PMCDatabase(db_file)
+        self.cache = SummaryCache(self.db, capacity=0)
+        self.model = model
+        self.backend = backend
+        self.model_key = summary_model_key(model, backend)
+        self.min_len = min_len
+        self.max_len = max_len
+        self.long_inputs = long_inputs
+        self.batch_size = max(1, batch_size)
+        self.num_threads = num_threads or os.cpu_count() or 1
+        self._summarizer = None
+        self._planner = None
+
+    def load_summarizer(self):
+        if self._summarizer is None:
+            import torch
+            torch.set_num_threads(self.num_threads)
+            self._summarizer = load_summarization_pipeline(self.model, device=-1, backend=self.backend)
+        return self._summarizer
+
+    def load_planner(self) -> SummaryPlanner:
+        if self._planner is None:
+            self._planner = SummaryPlanner.from_pretrained(self.model, min_len=self.min_len, max_len=self.max_len,
+                                                           long_inputs=self.long_inputs)
+        return self._planner
+
+    def pending(self) -> List[tuple]:
+        """(pmcid, text, plan) for every article without a cached summary."""
+        planner = self.load_planner()
+        todo = []
+        for record in self.db.fetch_filtered():
+            text = pick_summary_text(record)
+            if not text:
+                continue
+            plan = planner.plan(text)
+            if self.cache.get(record['pmcid'], text, self.model_key, plan.min_length, plan.max_length) is None:
+                todo.append((record['pmcid'], text, plan))
+        return todo
+
+    def _summarize_batch(self, texts: List[str], min_length: int, max_length: int) -> List[str]:
+        return run_summarizer(self.load_summarizer(), texts, min_length, max_length)
+
+    def _summarize_many(self, items: List[Tuple[str, int, int]]) -> List[str]:
+        groups = {}
+        for i, (text, min_length, max_length) in enumerate(items):
+            groups.setdefault((min_length, max_length), []).append(i)
+        summaries = [None] * len(items)
+        for (min_length, max_length), indexes in groups.items():
+            for i, summary in zip(indexes, self._summarize_batch([items[i][0] for i in indexes], min_length, max_length)):
+                summaries[i] = summary
+        return summaries
+
+    def run(self) -> dict:
+        todo = self.pending()
+        print(f"[DEBUG] {len(todo)} article(s) to summarize, batch size {self.batch_size}, {self.num_threads} thread(s)")
+
+        # generation lengths are per call, so batch single-pass articles that share them;
+        # map-reduce articles run one at a time with their chunks batched together
+        groups, chunked = {}, []
+        for item in todo:
+            plan = item[2]
+            if len(plan.chunks) == 1:
+                groups.setdefault((plan.min_length, plan.max_length), []).append(item)
+            else:
+                chunked.append(item)
+        batches = [(items[i:i + self.batch_size], lengths)
+                   for lengths, items in sorted(groups.items())
+                   for i in range(0, len(items), self.batch_size)]
+        batches += [([item], None) for item in chunked]
+
+        done, failed = 0, 0
+        start_time = time.time()
+        for batch, lengths in batches:
+            batch_start = time.time()
+            try:
+                if lengths is None:
+                    summaries = [summarize_plan(batch[0][2], self._summarize_many)]
+                else:
+                    summaries = self._summarize_batch([plan.chunks[0][0] for _, _, plan in batch], *lengths)
+            except Exception as e:
+                print(f"[ERROR] Batch of {len(batch)} failed ({e}), retrying one by one")
+                summaries = []
+                for _, _, plan in batch:
+                    try:
+                        summaries.append(summarize_plan(plan, self._summarize_many))
+                    except Exception as item_error:
+                        summaries.append(None)
+                        print(f"[ERROR] {item_error}")
+            for (pmcid, text, plan), summary in zip(batch, summaries):
+                if summary is None:
+                    failed += 1
+                    continue
+                self.cache.put(pmcid, text, self.model_key, plan.min_length, plan.max_length, summary)
+                done += 1
+            elapsed = time.time() - start_time
+            print(f"[DEBUG] {done + failed}/{len(todo)} summarized, batch {len(batch) / (time.time() - batch_start):.2f} "
+                  f"articles/sec, overall {done / elapsed if elapsed else 0:.2f} articles/sec")
+
+        elapsed = time.time() - start_time
+        stats = {
+            "summarized": done,
+            "failed": failed,
+            "elapsed": elapsed,
+            "articles_per_sec": done / elapsed if elapsed else 0.0,
+        }
+        print(f"[DEBUG] Summarized {done} article(s), {failed} failed in {elapsed:.2f} sec "
+              f"({stats['articles_per_sec']:.2f} articles/sec)")
+        return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pre-summarize every article into the summaries table.")
+    parser.add_argument("--db", default="pmc_articles_csv_metadata.db")
+    parser.add_argument("--model", default=SUMMARY_MODEL)
+    parser.add_argument("--backend", choices=SUMMARY_BACKENDS, default="torch")
+    parser.add_argument("--long-inputs", choices=("truncate", "chunk"), default=SUMMARY_LONG_INPUTS)
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--threads", type=int, default=None, help="torch CPU threads (default: all cores)")
+    args = parser.parse_args()
+
+    SummaryPipeline(args.db, model=args.model, batch_size=args.batch_size, num_threads=args.threads,
+                    backend=args.backend, long_inputs=args.long_inputs).run()